@@ -1,49 +1,182 @@
 from flask import Flask
+from flask_compress import Compress
+from jinja2 import FileSystemBytecodeCache
 from config import DevelopmentConfig as Config
+from .models import DatabaseManager
+from .services import Services
+from .utils import OrjsonProvider
+import atexit
 import logging
 import logging.handlers
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+LOG_DIR = Path(__file__).parent.parent / "logs"
 
-def create_app(config_class=Config):
-    app = Flask(__name__)
+# File log records are written in batches of this many, and at least every this
+# many seconds; WARNING and above are written straight away
+LOG_BUFFER_CAPACITY = 256
+LOG_BUFFER_SECONDS = 1.0
+
+_log_listener = None
+
+
+class _BufferedLogHandler(logging.handlers.MemoryHandler):
+    """MemoryHandler that also writes out its buffer every LOG_BUFFER_SECONDS."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # A timer thread, so records from a burst don't wait for the next record
+        self._closed = threading.Event()
+        threading.Thread(
+            target=self._flush_periodically, name="log-flush", daemon=True
+        ).start()
+
+    def _flush_periodically(self):
+        while not self._closed.wait(LOG_BUFFER_SECONDS):
+            self.flush()
+
+    def close(self):
+        self._closed.set()
+        super().close()
+
+
+class _Logger(logging.Logger):
+    """Logger that only looks up the calling function for WARNING and above."""
+
+    def _log(
+        self,
+        level,
+        msg,
+        args,
+        exc_info=None,
+        extra=None,
+        stack_info=False,
+        stacklevel=1,
+    ):
+        if level >= logging.WARNING or exc_info or stack_info:
+            # One more frame to skip: this method sits between the caller and
+            # the stdlib's own frames
+            super()._log(level, msg, args, exc_info, extra, stack_info, stacklevel + 1)
+            return
+        record = self.makeRecord(
+            self.name, level, "(unknown file)", 0, msg, args, None, extra=extra
+        )
+        self.handle(record)
+
+
+class _RootLogger(_Logger, logging.RootLogger):
+    """The root logger, with _Logger's caller lookup."""
+
+
+class _CallerFormatter(logging.Formatter):
+    """Formatter that adds the calling function and line to WARNING and above."""
+
+    def __init__(self, fmt, caller_fmt):
+        super().__init__(fmt)
+        self._caller_formatter = logging.Formatter(caller_fmt)
+
+    def format(self, record):
+        if record.levelno >= logging.WARNING:
+            return self._caller_formatter.format(record)
+        return super().format(record)
+
+
+def flush_log_buffer():
+    """Write any buffered log records to their files."""
+    if _log_listener is not None:
+        for handler in _log_listener.handlers:
+            handler.flush()
 
-    app.config.from_object(config_class)
+
+def configure_logging():
+    """Configure process-wide logging once and return the background listener."""
+    global _log_listener
+    if _log_listener is not None:
+        return _log_listener
+
+    # Records only carry what the formats below print; skipping caller lookup
+    # below WARNING and thread capture saves a stack walk and several calls per
+    # log record. The process ID is kept because gunicorn's own log format
+    # prints it. The root logger, behind logging.info() and friends, already
+    # exists, so it is switched over in place.
+    logging.setLoggerClass(_Logger)
+    logging.root.__class__ = _RootLogger
+    logging.logThreads = False
+    logging.logMultiprocessing = False
 
     # Configure comprehensive logging
-    log_dir = Path(__file__).parent.parent / "logs"
-    log_dir.mkdir(exist_ok=True)
+    LOG_DIR.mkdir(exist_ok=True)
 
     # Create formatter
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s"
+    formatter = _CallerFormatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        "%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s",
     )
 
     # Setup file handler with rotation
     file_handler = logging.handlers.RotatingFileHandler(
-        str(log_dir / "app.log"), maxBytes=10 * 1024 * 1024, backupCount=5  # 10MB
+        str(LOG_DIR / "app.log"), maxBytes=10 * 1024 * 1024, backupCount=5  # 10MB
     )
     file_handler.setFormatter(formatter)
     file_handler.setLevel(logging.DEBUG)
 
+    # Batch file writes so a burst of records becomes one write
+    buffered_file_handler = _BufferedLogHandler(
+        LOG_BUFFER_CAPACITY, flushLevel=logging.WARNING, target=file_handler
+    )
+    buffered_file_handler.setLevel(logging.DEBUG)
+
     # Setup console handler
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
     console_handler.setLevel(logging.INFO)
 
+    # Hand records to a background listener so request threads never block on
+    # file writes, flushes or rollover checks
+    log_queue = queue.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    _log_listener = logging.handlers.QueueListener(
+        log_queue, buffered_file_handler, console_handler, respect_handler_level=True
+    )
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+
     # Configure root logger
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.DEBUG)
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
+    root_logger.addHandler(queue_handler)
+
+    return _log_listener
+
+
+def create_app(config_class=Config):
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+
+    app.config.from_object(config_class)
+
+    # Compress HTML and JSON responses for clients that accept it
+    Compress(app)
+
+    # Logging is process-wide; only the first app created configures it
+    app.extensions["log_listener"] = configure_logging()
 
-    # Configure Flask app logger
+    # Flask app logger and werkzeug (Flask's HTTP request logger) propagate to root
     app.logger.setLevel(logging.DEBUG)
-    app.logger.addHandler(file_handler)
 
-    # Configure werkzeug logger (Flask's HTTP request logger)
-    werkzeug_logger = logging.getLogger("werkzeug")
-    werkzeug_logger.addHandler(file_handler)
+    # Deployments run here instead of on the request thread
+    app.extensions["deploy_pool"] = ThreadPoolExecutor(
+        max_workers=app.config["DEPLOY_WORKERS"],
+        thread_name_prefix="deploy",
+    )
+
+    # Slots for /deploys/stream connections, each of which holds a thread
+    app.extensions["deploy_event_streams"] = threading.BoundedSemaphore(
+        app.config["DEPLOY_EVENTS_MAX_STREAMS"]
+    )
 
     logging.info("Garcon application starting up")
 
@@ -52,4 +185,14 @@ def create_app(config_class=Config):
 
         app.register_blueprint(routes.bp)
 
+    # Keep compiled templates across restarts and compile them all up front,
+    # so no request pays for parsing a template
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
+    for template_name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(template_name)
+
+    # One database manager per app, so the schema setup runs once at startup
+    app.extensions["db"] = DatabaseManager()
+    app.extensions["services"] = Services(app.extensions["db"])
+
     return app
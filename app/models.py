@@ -1,8 +1,219 @@
 import sqlite3
 import logging
-from datetime import datetime
+import queue
+import threading
+import time
+import atexit
+import weakref
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
 
+# Maximum number of idle connections kept open per database file
+POOL_SIZE = 8
+
+# Applied to every new connection; WAL lets readers proceed during writes and
+# synchronous=NORMAL needs a single fsync per commit in WAL mode
+_INIT_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA foreign_keys=ON",
+)
+
+# Prepared statements kept per connection; the default of 128 is shared with
+# every ad-hoc query, so give the hot statements below room to stay compiled
+STATEMENT_CACHE_SIZE = 256
+
+# Buffered deployment rows are written once this many are pending, or after the interval
+DEPLOYMENT_FLUSH_SIZE = 50
+DEPLOYMENT_FLUSH_INTERVAL = 1.0
+
+# Bump when a new entry is added to _COLUMN_MIGRATIONS
+SCHEMA_VERSION = 1
+
+# Tables whose row counts are maintained in the counters table by triggers
+COUNTED_TABLES = ("projects", "deployments")
+
+# Columns added after the initial schema: (table, column, definition)
+_COLUMN_MIGRATIONS = (
+    ("projects", "deployment_uuid", "TEXT"),
+    ("deployments", "container_id", "TEXT"),
+    ("deployments", "deployment_uuid", "TEXT"),
+    ("deployments", "deployment_type", 'TEXT DEFAULT "blue-green"'),
+)
+
+# Project rows are cached in-process; every write to a project through this
+# manager invalidates it, so the TTL only bounds staleness from other processes
+PROJECT_CACHE_TTL = 30.0
+PROJECT_CACHE_SIZE = 512
+
+
+# Matches SQLite's CURRENT_TIMESTAMP, so Python-bound and default values sort together
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Hot-path statements, kept as module constants so each call hits the statement cache
+_SELECT_PROJECT_BY_REPO_NAME = "SELECT * FROM projects WHERE repo_name = ?"
+_SELECT_PROJECT_BY_ID = "SELECT * FROM projects WHERE id = ?"
+_UPSERT_PROJECT = """
+    INSERT INTO projects
+    (repo_name, repo_url, local_path, container_id, deployment_uuid, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(repo_name) DO UPDATE SET
+        repo_url = excluded.repo_url,
+        local_path = excluded.local_path,
+        container_id = excluded.container_id,
+        deployment_uuid = excluded.deployment_uuid,
+        updated_at = excluded.updated_at
+    RETURNING id
+"""
+_INSERT_DEPLOYMENT = """
+    INSERT INTO deployments
+    (project_id, status, commit_hash, error_message, container_id, deployment_uuid, deployment_type, deploy_time)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_UPDATE_PROJECT_CONTAINER = """
+    UPDATE projects
+    SET container_id = ?, updated_at = ?
+    WHERE id = ?
+"""
+_SELECT_DEPLOYMENT_HISTORY = """
+    SELECT * FROM deployments
+    WHERE project_id = ?
+    ORDER BY deploy_time DESC
+    LIMIT ? OFFSET ?
+"""
+_COUNT_PROJECT_DEPLOYMENTS = "SELECT COUNT(*) FROM deployments WHERE project_id = ?"
+_SELECT_RECENT_DEPLOYMENTS = """
+    SELECT d.*, p.repo_name
+    FROM deployments d
+    JOIN projects p ON d.project_id = p.id
+    ORDER BY d.deploy_time DESC
+    LIMIT ?
+"""
+_SELECT_LATEST_DEPLOYMENTS = """
+    SELECT d.*
+    FROM projects p
+    JOIN deployments d ON d.id = (
+        SELECT id FROM deployments
+        WHERE project_id = p.id
+        ORDER BY deploy_time DESC
+        LIMIT 1
+    )
+"""
+_SELECT_ALL_PROJECTS = "SELECT * FROM projects ORDER BY created_at DESC"
+_SELECT_COUNTER = "SELECT n FROM counters WHERE name = ?"
+_SELECT_ACTIVE_DEPLOYMENT = """
+    SELECT id FROM deployments
+    WHERE project_id = ? AND status = 'started'
+    ORDER BY deploy_time DESC LIMIT 1
+"""
+_INSERT_STARTED_DEPLOYMENT = """
+    INSERT INTO deployments (project_id, status, deployment_type, deploy_time)
+    VALUES (?, 'started', ?, ?)
+"""
+_FINISH_DEPLOYMENT = """
+    UPDATE deployments
+    SET status = ?, container_id = ?, deployment_uuid = ?, error_message = ?
+    WHERE id = ?
+"""
+
+
+def utc_timestamp():
+    """Return the current UTC time formatted like SQLite's CURRENT_TIMESTAMP."""
+    return datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+
+def rows_to_dicts(rows):
+    """Convert sqlite3.Row results to plain dicts for JSON serialization."""
+    return [dict(row) for row in rows]
+
+
+class _ConnectionPool:
+    """Bounded pool of long-lived SQLite connections for a single database file."""
+
+    def __init__(self, db_path, size=POOL_SIZE):
+        self.db_path = db_path
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+    def _create_connection(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.row_factory = sqlite3.Row  # Enable column access by name
+        for pragma in _INIT_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection, returning it to the pool when done."""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._create_connection()
+
+        try:
+            yield conn
+        except BaseException:
+            # Never hand a connection with an open transaction back to the pool
+            conn.rollback()
+            raise
+        finally:
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    @contextmanager
+    def writer(self):
+        """Run a write transaction on the pool's single writer connection."""
+        # Writers queue on the lock and take SQLite's write lock up front, so a
+        # transaction never has to upgrade its lock midway and hit SQLITE_BUSY
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = self._create_connection()
+            conn = self._writer
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            if conn.in_transaction:
+                conn.commit()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(db_path):
+    """Return the process-wide connection pool for a database file."""
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = _pools[db_path] = _ConnectionPool(db_path)
+        return pool
+
+
+_managers = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all_managers():
+    """Write out any deployment rows still buffered when the process exits."""
+    for manager in list(_managers):
+        manager.flush_deployments()
+
 
 class DatabaseManager:
     def __init__(self, db_path=None):
@@ -14,12 +225,68 @@ class DatabaseManager:
             db_path = data_dir / "projects.db"
 
         self.db_path = str(db_path)
+        self._pool = _get_pool(self.db_path)
+        self._project_cache = OrderedDict()
+        self._project_cache_lock = threading.Lock()
+        self._pending_deployments = deque()
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_timer = None
+        self._initialized = False
         self.init_database()
+        _managers.add(self)
+
+    def _conn(self):
+        """Borrow a pooled connection to the database."""
+        return self._pool.connection()
+
+    def _writer(self):
+        """Open a write transaction on the shared writer connection."""
+        return self._pool.writer()
+
+    def _get_cached_project(self, key):
+        """Return a copy of a cached project row, or None if missing or expired."""
+        with self._project_cache_lock:
+            entry = self._project_cache.get(key)
+            if entry is None:
+                return None
+
+            cached_at, project = entry
+            if time.monotonic() - cached_at > PROJECT_CACHE_TTL:
+                del self._project_cache[key]
+                return None
+
+            self._project_cache.move_to_end(key)
+            return dict(project)
+
+    def _cache_project(self, project):
+        """Cache a project row under both its repository name and its ID."""
+        cached_at = time.monotonic()
+        with self._project_cache_lock:
+            for key in (("repo_name", project["repo_name"]), ("id", project["id"])):
+                self._project_cache[key] = (cached_at, dict(project))
+                self._project_cache.move_to_end(key)
+
+            while len(self._project_cache) > PROJECT_CACHE_SIZE:
+                self._project_cache.popitem(last=False)
+
+    def _invalidate_project(self, repo_name=None, project_id=None):
+        """Drop every cached entry for a project, whichever key it was stored under."""
+        with self._project_cache_lock:
+            stale_keys = [
+                key
+                for key, (_, project) in self._project_cache.items()
+                if project["repo_name"] == repo_name or project["id"] == project_id
+            ]
+            for key in stale_keys:
+                del self._project_cache[key]
 
     def init_database(self):
         """Initialize the database and create tables if they don't exist."""
+        if getattr(self, "_initialized", False):
+            return
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._writer() as conn:
                 cursor = conn.cursor()
 
                 # Create projects table
@@ -56,68 +323,143 @@ class DatabaseManager:
                 """
                 )
 
-                # Add deployment_uuid column to projects table if it doesn't exist
-                cursor.execute("PRAGMA table_info(projects)")
-                columns = [column[1] for column in cursor.fetchall()]
-                if "deployment_uuid" not in columns:
+                # Column migrations only need to run once per database file
+                cursor.execute("PRAGMA user_version")
+                migrating = cursor.fetchone()[0] < SCHEMA_VERSION
+                if migrating:
+                    self._migrate_columns(cursor)
+                    cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+                # Index the deployment history lookups so they don't scan and sort
+                cursor.execute(
+                    """
+                    CREATE INDEX IF NOT EXISTS idx_deployments_proj_time
+                    ON deployments (project_id, deploy_time DESC)
+                """
+                )
+                cursor.execute(
+                    """
+                    CREATE INDEX IF NOT EXISTS idx_deployments_time
+                    ON deployments (deploy_time DESC)
+                """
+                )
+
+                # Keep row counts in a side table so the dashboard doesn't COUNT(*) scan
+                cursor.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS counters (
+                        name TEXT PRIMARY KEY,
+                        n INTEGER NOT NULL DEFAULT 0
+                    )
+                """
+                )
+                for table in COUNTED_TABLES:
                     cursor.execute(
-                        "ALTER TABLE projects ADD COLUMN deployment_uuid TEXT"
+                        f"""
+                        CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON {table}
+                        BEGIN UPDATE counters SET n = n + 1 WHERE name = '{table}'; END
+                    """
                     )
-                    logging.info("Added deployment_uuid column to projects table")
-
-                # Add columns to deployments table if they don't exist
-                cursor.execute("PRAGMA table_info(deployments)")
-                columns = [column[1] for column in cursor.fetchall()]
-                if "container_id" not in columns:
                     cursor.execute(
-                        "ALTER TABLE deployments ADD COLUMN container_id TEXT"
+                        f"""
+                        CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON {table}
+                        BEGIN UPDATE counters SET n = n - 1 WHERE name = '{table}'; END
+                    """
                     )
-                    logging.info("Added container_id column to deployments table")
-                if "deployment_uuid" not in columns:
+                    # Reseed from the real count in case rows changed without triggers
                     cursor.execute(
-                        "ALTER TABLE deployments ADD COLUMN deployment_uuid TEXT"
+                        f"INSERT OR REPLACE INTO counters (name, n) "
+                        f"SELECT '{table}', COUNT(*) FROM {table}"
                     )
-                    logging.info("Added deployment_uuid column to deployments table")
-                if "deployment_type" not in columns:
+
+                    # A version number bumped on every change, used for HTTP ETags
+                    for event in ("INSERT", "UPDATE", "DELETE"):
+                        cursor.execute(
+                            f"""
+                            CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()}
+                            AFTER {event} ON {table}
+                            BEGIN UPDATE counters SET n = n + 1 WHERE name = '{table}_version'; END
+                        """
+                        )
                     cursor.execute(
-                        'ALTER TABLE deployments ADD COLUMN deployment_type TEXT DEFAULT "blue-green"'
+                        "INSERT OR IGNORE INTO counters (name, n) VALUES (?, 0)",
+                        (f"{table}_version",),
                     )
-                    logging.info("Added deployment_type column to deployments table")
+
+                # Refresh planner statistics so the indexes above are picked up;
+                # only on a schema change, as ANALYZE scans every table under the
+                # write lock
+                if migrating:
+                    cursor.execute("ANALYZE")
 
                 conn.commit()
+                self._initialized = True
                 logging.info("Database initialized successfully")
 
         except sqlite3.Error as e:
             logging.error(f"Database initialization error: {e}")
             raise
 
-    def get_project_by_repo_name(self, repo_name):
+    def _migrate_columns(self, cursor):
+        """Add columns introduced after the initial schema to older databases."""
+        # Read the columns of both tables in a single query
+        cursor.execute(
+            """
+            SELECT m.name, c.name
+            FROM sqlite_master m, pragma_table_info(m.name) c
+            WHERE m.type = 'table' AND m.name IN ('projects', 'deployments')
+        """
+        )
+        columns = {(table, column) for table, column in cursor.fetchall()}
+
+        for table, column, definition in _COLUMN_MIGRATIONS:
+            if (table, column) not in columns:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+                logging.info(f"Added {column} column to {table} table")
+
+    def get_project_by_repo_name(self, repo_name, cache=True):
         """Get project information by repository name."""
+        if cache:
+            project = self._get_cached_project(("repo_name", repo_name))
+            if project:
+                return project
+
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row  # Enable column access by name
+            with self._conn() as conn:
                 cursor = conn.cursor()
 
-                cursor.execute(
-                    "SELECT * FROM projects WHERE repo_name = ?", (repo_name,)
-                )
+                cursor.execute(_SELECT_PROJECT_BY_REPO_NAME, (repo_name,))
                 result = cursor.fetchone()
-                return dict(result) if result else None
+                if not result:
+                    return None
+
+                project = dict(result)
+                self._cache_project(project)
+                return project
 
         except sqlite3.Error as e:
             logging.error(f"Error fetching project {repo_name}: {e}")
             return None
 
-    def get_project_by_id(self, project_id):
+    def get_project_by_id(self, project_id, cache=True):
         """Get project information by project ID."""
+        if cache:
+            project = self._get_cached_project(("id", project_id))
+            if project:
+                return project
+
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row  # Enable column access by name
+            with self._conn() as conn:
                 cursor = conn.cursor()
 
-                cursor.execute("SELECT * FROM projects WHERE id = ?", (project_id,))
+                cursor.execute(_SELECT_PROJECT_BY_ID, (project_id,))
                 result = cursor.fetchone()
-                return dict(result) if result else None
+                if not result:
+                    return None
+
+                project = dict(result)
+                self._cache_project(project)
+                return project
 
         except sqlite3.Error as e:
             logging.error(f"Error fetching project with ID {project_id}: {e}")
@@ -133,50 +475,28 @@ class DatabaseManager:
     ):
         """Add a new project or update an existing one."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._writer() as conn:
                 cursor = conn.cursor()
 
-                # Check if project exists
-                existing_project = self.get_project_by_repo_name(repo_name)
-
-                if existing_project:
-                    # Update existing project
-                    cursor.execute(
-                        """
-                        UPDATE projects 
-                        SET repo_url = ?, local_path = ?, container_id = ?, 
-                            deployment_uuid = ?, updated_at = CURRENT_TIMESTAMP
-                        WHERE repo_name = ?
-                    """,
-                        (
-                            repo_url,
-                            local_path,
-                            container_id,
-                            deployment_uuid,
-                            repo_name,
-                        ),
-                    )
-                    project_id = existing_project["id"]
-                    logging.info(f"Updated existing project: {repo_name}")
-                else:
-                    # Insert new project
-                    cursor.execute(
-                        """
-                        INSERT INTO projects (repo_name, repo_url, local_path, container_id, deployment_uuid)
-                        VALUES (?, ?, ?, ?, ?)
-                    """,
-                        (
-                            repo_name,
-                            repo_url,
-                            local_path,
-                            container_id,
-                            deployment_uuid,
-                        ),
-                    )
-                    project_id = cursor.lastrowid
-                    logging.info(f"Added new project: {repo_name}")
+                # Insert or update in a single statement keyed on the unique repo_name
+                now = utc_timestamp()
+                cursor.execute(
+                    _UPSERT_PROJECT,
+                    (
+                        repo_name,
+                        repo_url,
+                        local_path,
+                        container_id,
+                        deployment_uuid,
+                        now,
+                        now,
+                    ),
+                )
+                project_id = cursor.fetchone()[0]
+                logging.info(f"Saved project: {repo_name} (ID: {project_id})")
 
                 conn.commit()
+                self._invalidate_project(repo_name=repo_name, project_id=project_id)
                 return project_id
 
         except sqlite3.Error as e:
@@ -193,55 +513,143 @@ class DatabaseManager:
         deployment_uuid=None,
         deployment_type="blue-green",
     ):
-        """Log a deployment attempt with comprehensive information."""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
-                cursor.execute(
-                    """
-                    INSERT INTO deployments 
-                    (project_id, status, commit_hash, error_message, container_id, deployment_uuid, deployment_type)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-                    (
-                        project_id,
-                        status,
-                        commit_hash,
-                        error_message,
-                        container_id,
-                        deployment_uuid,
-                        deployment_type,
-                    ),
+        """Log a deployment attempt; the row is buffered and written in a batch."""
+        row = (
+            project_id,
+            status,
+            commit_hash,
+            error_message,
+            container_id,
+            deployment_uuid,
+            deployment_type,
+            utc_timestamp(),  # Stamped now, not when the batch is flushed
+        )
+
+        with self._pending_lock:
+            self._pending_deployments.append(row)
+            flush_now = len(self._pending_deployments) >= DEPLOYMENT_FLUSH_SIZE
+            if not flush_now and self._flush_timer is None:
+                self._flush_timer = threading.Timer(
+                    DEPLOYMENT_FLUSH_INTERVAL, self.flush_deployments
                 )
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
 
-                conn.commit()
-                logging.info(
-                    f"Logged {deployment_type} deployment for project ID {project_id}: {status}"
-                )
+        logging.info(
+            f"Logged {deployment_type} deployment for project ID {project_id}: {status}"
+        )
 
-        except sqlite3.Error as e:
-            logging.error(f"Error logging deployment: {e}")
+        if flush_now:
+            self.flush_deployments()
+
+    def log_deployment_sync(self, *args, **kwargs):
+        """Log a deployment attempt and write it to the database before returning."""
+        self.log_deployment(*args, **kwargs)
+        self.flush_deployments()
+
+    def log_deployment_and_update_container(
+        self,
+        project_id,
+        status,
+        commit_hash=None,
+        error_message=None,
+        container_id=None,
+        deployment_uuid=None,
+        deployment_type="blue-green",
+    ):
+        """Log a deployment and record its container on the project in one commit."""
+        self.log_deployment(
+            project_id,
+            status,
+            commit_hash,
+            error_message,
+            container_id,
+            deployment_uuid,
+            deployment_type,
+        )
+        self.flush_deployments(container_update=(project_id, container_id))
+
+    def flush_deployments(self, container_update=None):
+        """
+        Write all buffered deployment rows in a single transaction.
+
+        Args:
+            container_update (tuple): Optional (project_id, container_id) to set
+                on the project in the same transaction
+
+        Returns:
+            int: Number of deployment rows written
+        """
+        # Serialize flushes so batches are committed in the order they were logged
+        with self._flush_lock:
+            with self._pending_lock:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+                rows = list(self._pending_deployments)
+                self._pending_deployments.clear()
+
+            if not rows and container_update is None:
+                return 0
+
+            try:
+                with self._writer() as conn:
+                    conn.executemany(_INSERT_DEPLOYMENT, rows)
+                    if container_update is not None:
+                        project_id, container_id = container_update
+                        conn.execute(
+                            _UPDATE_PROJECT_CONTAINER,
+                            (container_id, utc_timestamp(), project_id),
+                        )
+                    conn.commit()
+                    logging.debug(f"Wrote {len(rows)} buffered deployment records")
+                written = len(rows)
+
+            except sqlite3.Error as e:
+                # Don't let one bad row cost the whole batch: write each row and
+                # the container update on their own, losing only what fails again
+                logging.error(f"Error logging deployments, retrying one by one: {e}")
+                written = self._write_deployments_separately(rows, container_update)
+
+            if container_update is not None:
+                self._invalidate_project(project_id=container_update[0])
+            return written
+
+    def _write_deployments_separately(self, rows, container_update):
+        """Write deployment rows and a container update in separate transactions."""
+        written = 0
+        for row in rows:
+            try:
+                with self._writer() as conn:
+                    conn.execute(_INSERT_DEPLOYMENT, row)
+                written += 1
+            except sqlite3.Error as e:
+                logging.error(f"Error logging deployment for project {row[0]}: {e}")
+
+        if container_update is not None:
+            project_id, container_id = container_update
+            try:
+                with self._writer() as conn:
+                    conn.execute(
+                        _UPDATE_PROJECT_CONTAINER,
+                        (container_id, utc_timestamp(), project_id),
+                    )
+            except sqlite3.Error as e:
+                logging.error(
+                    f"Error updating container for project {project_id}: {e}"
+                )
+        return written
 
-    def get_deployment_history(self, project_id, limit=50):
-        """Get deployment history for a project."""
+    def get_deployment_history(self, project_id, limit=50, offset=0):
+        """Get a page of a project's deployment history as sqlite3.Row objects."""
+        self.flush_deployments()
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._conn() as conn:
                 cursor = conn.cursor()
 
-                cursor.execute(
-                    """
-                    SELECT * FROM deployments 
-                    WHERE project_id = ? 
-                    ORDER BY deploy_time DESC 
-                    LIMIT ?
-                """,
-                    (project_id, limit),
-                )
+                cursor.execute(_SELECT_DEPLOYMENT_HISTORY, (project_id, limit, offset))
 
-                results = cursor.fetchall()
-                return [dict(row) for row in results]
+                return cursor.fetchall()
 
         except sqlite3.Error as e:
             logging.error(
@@ -249,84 +657,113 @@ class DatabaseManager:
             )
             return []
 
-    def get_recent_deployments(self, limit=20):
-        """Get recent deployments across all projects."""
+    def get_latest_deployments(self):
+        """Get each project's most recent deployment, keyed by project ID."""
+        self.flush_deployments()
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
+            with self._conn() as conn:
+                cursor = conn.execute(_SELECT_LATEST_DEPLOYMENTS)
+                return {row["project_id"]: row for row in cursor}
 
-                cursor.execute(
-                    """
-                    SELECT d.*, p.repo_name 
-                    FROM deployments d
-                    JOIN projects p ON d.project_id = p.id
-                    ORDER BY d.deploy_time DESC 
-                    LIMIT ?
-                """,
-                    (limit,),
-                )
+        except sqlite3.Error as e:
+            logging.error(f"Error fetching latest deployments: {e}")
+            return {}
 
-                results = cursor.fetchall()
-                return [dict(row) for row in results]
+    def get_recent_deployments(self, limit=20):
+        """Get recent deployments across all projects as sqlite3.Row objects."""
+        return list(self.iter_recent_deployments(limit))
+
+    def iter_recent_deployments(self, limit=20):
+        """Yield recent deployments as the cursor produces them."""
+        self.flush_deployments()
+        try:
+            # The pooled connection is held until the generator finishes or is closed
+            with self._conn() as conn:
+                yield from conn.execute(_SELECT_RECENT_DEPLOYMENTS, (limit,))
 
         except sqlite3.Error as e:
             logging.error(f"Error fetching recent deployments: {e}")
-            return []
 
     def get_all_projects(self):
         """Get all projects in the database."""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
+        return list(self.iter_all_projects())
 
-                cursor.execute("SELECT * FROM projects ORDER BY created_at DESC")
-                results = cursor.fetchall()
-                return [dict(row) for row in results]
+    def iter_all_projects(self):
+        """Yield all projects as dicts without materializing the result set."""
+        try:
+            with self._conn() as conn:
+                for row in conn.execute(_SELECT_ALL_PROJECTS):
+                    yield dict(row)
 
         except sqlite3.Error as e:
             logging.error(f"Error fetching all projects: {e}")
-            return []
 
     def get_project_count(self):
         """Get the total count of projects."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._conn() as conn:
                 cursor = conn.cursor()
-                cursor.execute("SELECT COUNT(*) FROM projects")
-                return cursor.fetchone()[0]
+                cursor.execute(_SELECT_COUNTER, ("projects",))
+                row = cursor.fetchone()
+                return row[0] if row else 0
         except sqlite3.Error as e:
             logging.error(f"Error fetching project count: {e}")
             return 0
 
     def get_deployment_count(self):
         """Get the total count of deployments."""
+        self.flush_deployments()
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._conn() as conn:
                 cursor = conn.cursor()
-                cursor.execute("SELECT COUNT(*) FROM deployments")
-                return cursor.fetchone()[0]
+                cursor.execute(_SELECT_COUNTER, ("deployments",))
+                row = cursor.fetchone()
+                return row[0] if row else 0
         except sqlite3.Error as e:
             logging.error(f"Error fetching deployment count: {e}")
             return 0
 
+    def get_project_deployment_count(self, project_id):
+        """Get the total count of a project's deployments."""
+        self.flush_deployments()
+        try:
+            with self._conn() as conn:
+                # Answered from the (project_id, deploy_time) index
+                cursor = conn.execute(_COUNT_PROJECT_DEPLOYMENTS, (project_id,))
+                return cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            logging.error(
+                f"Error fetching deployment count for project {project_id}: {e}"
+            )
+            return 0
+
+    def get_table_version(self, table):
+        """Get a number that changes whenever rows in the given table change."""
+        if table == "deployments":
+            self.flush_deployments()
+        try:
+            with self._conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute(_SELECT_COUNTER, (f"{table}_version",))
+                row = cursor.fetchone()
+                return row[0] if row else 0
+        except sqlite3.Error as e:
+            logging.error(f"Error fetching {table} version: {e}")
+            return None
+
     def update_project_container_id(self, project_id, container_id):
         """Update the container_id for a specific project."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._writer() as conn:
                 cursor = conn.cursor()
 
                 cursor.execute(
-                    """
-                    UPDATE projects 
-                    SET container_id = ?, updated_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                """,
-                    (container_id, project_id),
+                    _UPDATE_PROJECT_CONTAINER,
+                    (container_id, utc_timestamp(), project_id),
                 )
 
                 conn.commit()
+                self._invalidate_project(project_id=project_id)
                 if container_id:
                     logging.info(
                         f"Updated container ID for project ID {project_id}: {container_id}"
@@ -340,13 +777,14 @@ class DatabaseManager:
     def delete_project(self, project_id):
         """Delete a project from the database."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._writer() as conn:
                 cursor = conn.cursor()
 
                 cursor.execute("DELETE FROM projects WHERE id = ?", (project_id,))
                 deleted_count = cursor.rowcount
 
                 conn.commit()
+                self._invalidate_project(project_id=project_id)
                 if deleted_count > 0:
                     logging.info(f"Deleted project with ID {project_id} from database")
                 else:
@@ -360,8 +798,9 @@ class DatabaseManager:
 
     def delete_deployment_history(self, project_id):
         """Delete all deployment history for a project."""
+        self.flush_deployments()
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._writer() as conn:
                 cursor = conn.cursor()
 
                 cursor.execute(
@@ -381,3 +820,95 @@ class DatabaseManager:
                 f"Error deleting deployment history for project {project_id}: {e}"
             )
             return 0
+
+    def fail_stuck_deployments(self, project_id, started_before):
+        """Mark deployments still 'started' before the given time as failed."""
+        self.flush_deployments()
+        try:
+            with self._writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute(
+                    """
+                    UPDATE deployments
+                    SET status = 'failed', error_message = 'Auto-failed: stuck deployment (timeout)'
+                    WHERE project_id = ? AND status = 'started' AND deploy_time < ?
+                """,
+                    (project_id, started_before),
+                )
+                rows_updated = cursor.rowcount
+
+                conn.commit()
+                if rows_updated > 0:
+                    logging.info(
+                        f"Auto-failed {rows_updated} stuck deployments for project {project_id}"
+                    )
+
+                return rows_updated
+
+        except sqlite3.Error as e:
+            logging.error(f"Error auto-failing stuck deployments: {e}")
+            return 0
+
+    def start_deployment(self, project_id, deployment_type="blue-green"):
+        """
+        Create a 'started' deployment record unless one is already running.
+
+        Returns:
+            tuple: (deployment_id, active_id) where exactly one is set, or
+            (None, None) if the database could not be updated
+        """
+        self.flush_deployments()
+        try:
+            # Check and insert in one write transaction so two requests can't both start
+            with self._writer() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute(_SELECT_ACTIVE_DEPLOYMENT, (project_id,))
+                active_deployment = cursor.fetchone()
+                if active_deployment:
+                    conn.rollback()
+                    return None, active_deployment["id"]
+
+                cursor.execute(
+                    _INSERT_STARTED_DEPLOYMENT,
+                    (project_id, deployment_type, utc_timestamp()),
+                )
+                deployment_id = cursor.lastrowid
+
+                conn.commit()
+                logging.info(
+                    f"Created deployment record {deployment_id} for project {project_id}"
+                )
+                return deployment_id, None
+
+        except sqlite3.Error as e:
+            logging.error(f"Database error during deployment check: {e}")
+            return None, None
+
+    def finish_deployment(
+        self,
+        deployment_id,
+        status,
+        container_id=None,
+        deployment_uuid=None,
+        error_message=None,
+    ):
+        """Record the outcome of a deployment created by start_deployment."""
+        try:
+            with self._writer() as conn:
+                conn.execute(
+                    _FINISH_DEPLOYMENT,
+                    (
+                        status,
+                        container_id,
+                        deployment_uuid,
+                        error_message,
+                        deployment_id,
+                    ),
+                )
+                conn.commit()
+                logging.info(f"Updated deployment {deployment_id} with {status} status")
+
+        except sqlite3.Error as e:
+            logging.error(f"Error updating deployment status: {e}")
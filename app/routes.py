@@ -1,42 +1,105 @@
+import fcntl
+import queue
+import shutil
+import signal
 import subprocess
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+import orjson
 from flask import (
     Blueprint,
+    Response,
     request,
     jsonify,
     current_app,
     render_template,
+    send_file,
     flash,
     redirect,
     url_for,
 )
-from . import services
-from .utils import verify_github_webhook
+from . import flush_log_buffer
+from .models import TIMESTAMP_FORMAT, rows_to_dicts
+from .utils import tail_lines, verify_github_webhook
 import logging
 import os
 from pathlib import Path
 
 bp = Blueprint("main", __name__)
 
+# Resolved once at import instead of on every request
+_ROOT_DIR = Path(__file__).resolve().parent.parent
+_BLUE_GREEN_SCRIPT = str(_ROOT_DIR / "blue_green_deploy.sh")
+_DEPLOY_SCRIPT = str(_ROOT_DIR / "deploy.sh")
+_SCRIPT_BY_TYPE = {"blue-green": _BLUE_GREEN_SCRIPT}
+_APP_LOG = _ROOT_DIR / "logs" / "app.log"
+_DEPLOY_LOG = _ROOT_DIR / "logs" / "deploy.log"
+_RAW_LOGS = {"app": _APP_LOG, "deploy": _DEPLOY_LOG}
+_LOCK_DIR = _ROOT_DIR / "locks"
+_PROJECTS_DATA_DIR = _ROOT_DIR / "projects_data"
+
+# Markers the deployment scripts print on their own lines as "NAME: value"
+_OUTPUT_MARKERS = {
+    "CONTAINER_ID": "container_id",
+    "DEPLOYMENT_UUID": "deployment_uuid",
+}
+
+# Deploy scripts get no stdin and their own session, so a timeout can stop the
+# whole process group. Python opens descriptors non-inheritable, so skipping
+# close_fds avoids a close() sweep up to RLIMIT_NOFILE on every spawn
+_SCRIPT_POPEN_KW = {
+    "stdin": subprocess.DEVNULL,
+    "close_fds": False,
+    "start_new_session": True,
+}
+
+# Lines of deploy script output kept in memory for logging and error messages
+DEPLOY_OUTPUT_TAIL_LINES = 200
+
+# Repos with a webhook deployment in progress, and the latest push for each
+# that arrived meanwhile as (repo_url, commit_hash)
+_webhook_deploys_lock = threading.Lock()
+_webhook_deploys_running = set()
+_webhook_deploys_pending = {}
+
+# Seconds between keep-alive comments on an idle deployment event stream
+DEPLOY_EVENTS_KEEPALIVE = 15
+
+# Seconds browsers may cache the redirect from / to the dashboard
+INDEX_REDIRECT_MAX_AGE = 3600
+
+# Page size of /projects/<name>/deployments, and the largest one a client may ask for
+DEPLOYMENT_HISTORY_PAGE_SIZE = 50
+DEPLOYMENT_HISTORY_MAX_PAGE_SIZE = 500
+
+
+def _dashboard_data(service):
+    """Load the dashboard's deployments, projects and stats."""
+    recent_deployments = service.db.get_recent_deployments(5)
+    all_projects = service.db.get_all_projects()
+
+    # Add actual status for each project; the dashboard doesn't show URLs
+    statuses = service.get_project_statuses(all_projects)
+    for project, status in zip(all_projects, statuses):
+        project["actual_status"] = status
+
+    # Calculate stats for the dashboard using efficient count methods
+    stats = {
+        "total_projects": service.db.get_project_count(),
+        "total_deployments": service.db.get_deployment_count(),
+    }
+
+    return recent_deployments, all_projects, stats
+
 
 # Web UI Routes
 @bp.route("/dashboard")
 def dashboard():
     """Main dashboard web interface."""
     try:
-        service = services.Services()
-        recent_deployments = service.db.get_recent_deployments(5)
-        all_projects = service.db.get_all_projects()
-
-        # Add URLs and actual status for each project
-        for project in all_projects:
-            project["urls"] = service.get_project_urls(project["repo_name"])
-            project["actual_status"] = service.get_project_status(project)
-
-        # Calculate stats for the dashboard using efficient count methods
-        stats = {
-            "total_projects": service.db.get_project_count(),
-            "total_deployments": service.db.get_deployment_count(),
-        }
+        service = current_app.extensions["services"]
+        recent_deployments, all_projects, stats = _dashboard_data(service)
 
         return render_template(
             "dashboard.html",
@@ -58,16 +121,18 @@ def dashboard():
 def projects_ui():
     """Projects management web interface."""
     try:
-        service = services.Services()
+        service = current_app.extensions["services"]
         projects = service.db.get_all_projects()
 
         # Add URLs, deployment status, and actual status for each project
-        for project in projects:
-            project["urls"] = service.get_project_urls(project["repo_name"])
-            project["actual_status"] = service.get_project_status(project)
-            # Get latest deployment status
-            deployments = service.db.get_deployment_history(project["id"], limit=1)
-            project["latest_deployment"] = deployments[0] if deployments else None
+        url_map = service.get_project_urls_bulk([p["repo_name"] for p in projects])
+        statuses = service.get_project_statuses(projects)
+        # Latest deployment of every project in one query
+        latest_deployments = service.db.get_latest_deployments()
+        for project, status in zip(projects, statuses):
+            project["urls"] = url_map[project["repo_name"]]
+            project["actual_status"] = status
+            project["latest_deployment"] = latest_deployments.get(project["id"])
 
         return render_template("projects.html", projects=projects)
     except Exception as e:
@@ -92,7 +157,7 @@ def add_project_form():
                 flash("All fields are required", "error")
                 return render_template("add_project.html")
 
-            service = services.Services()
+            service = current_app.extensions["services"]
 
             # Create project using the provided name and git_url
             project = service.get_or_create_project(name, git_url)
@@ -105,66 +170,15 @@ def add_project_form():
                 # Deploy immediately if requested
                 if deploy_immediately:
                     try:
-                        # Log deployment attempt
-                        service.log_deployment_status(
-                            project["id"], "started", deployment_type=deployment_type
+                        # Run deployment on the shared worker pool
+                        future = current_app.extensions["deploy_pool"].submit(
+                            _run_deploy_and_log,
+                            service,
+                            project,
+                            git_url,
+                            deployment_type,
                         )
-
-                        # Choose deployment script
-                        current_dir = Path(__file__).parent.parent
-                        if deployment_type == "blue-green":
-                            deploy_script = current_dir / "blue_green_deploy.sh"
-                        else:
-                            deploy_script = current_dir / "deploy.sh"
-
-                        # Run deployment in background
-                        import threading
-
-                        def run_deployment():
-                            try:
-                                result = subprocess.run(
-                                    [str(deploy_script), git_url],
-                                    check=True,
-                                    capture_output=True,
-                                    text=True,
-                                    timeout=600,
-                                )
-
-                                # Extract deployment info
-                                container_id = None
-                                deployment_uuid = None
-
-                                for line in result.stdout.strip().split("\n"):
-                                    if line.startswith("CONTAINER_ID:"):
-                                        container_id = line.split(":", 1)[1].strip()
-                                    elif line.startswith("DEPLOYMENT_UUID:"):
-                                        deployment_uuid = line.split(":", 1)[1].strip()
-
-                                # Log success
-                                service.log_deployment_status(
-                                    project["id"],
-                                    "success",
-                                    container_id=container_id,
-                                    deployment_uuid=deployment_uuid,
-                                    deployment_type=deployment_type,
-                                )
-
-                                logging.info(f"Initial deployment completed for {name}")
-
-                            except Exception as e:
-                                error_msg = f"Initial deployment failed: {str(e)}"
-                                logging.error(error_msg)
-                                service.log_deployment_status(
-                                    project["id"],
-                                    "failed",
-                                    error_message=error_msg,
-                                    deployment_type=deployment_type,
-                                )
-
-                        # Start deployment in background
-                        deployment_thread = threading.Thread(target=run_deployment)
-                        deployment_thread.daemon = True
-                        deployment_thread.start()
+                        future.add_done_callback(_log_deployment_future(name))
 
                         flash("Deployment started successfully!", "info")
 
@@ -189,7 +203,7 @@ def add_project_form():
 def project_detail(project_name):
     """Project detail web interface."""
     try:
-        service = services.Services()
+        service = current_app.extensions["services"]
         project = service.db.get_project_by_repo_name(project_name)
 
         if not project:
@@ -221,7 +235,7 @@ def project_detail(project_name):
 def deployment_history_ui():
     """Deployment history web interface."""
     try:
-        service = services.Services()
+        service = current_app.extensions["services"]
         deployments = service.db.get_recent_deployments(50)  # Get last 50 deployments
 
         return render_template("deployment_history.html", deployments=deployments)
@@ -235,48 +249,38 @@ def deployment_history_ui():
 def view_logs_ui():
     """Logs viewer web interface."""
     try:
-        current_dir = Path(__file__).parent.parent
-
+        flush_log_buffer()
         # Read recent logs
-        app_log_file = current_dir / "logs" / "app.log"
-        deploy_log_file = current_dir / "logs" / "deploy.log"
+        app_log_file = _APP_LOG
+        deploy_log_file = _DEPLOY_LOG
 
         app_logs = ""
         deploy_logs = ""
         log_stats = {}
 
-        if app_log_file.exists():
-            with open(app_log_file, "r") as f:
-                lines = f.readlines()
-                app_logs = "".join(lines[-50:]) if lines else "No application logs yet."
-
-            # Get file stats
-            stat = app_log_file.stat()
+        # One stat per file both checks that it exists and gets its stats
+        try:
+            stat = os.stat(app_log_file)
             log_stats["app_log_size"] = f"{stat.st_size / 1024:.1f} KB"
-        else:
+            lines = tail_lines(app_log_file, 50)
+            app_logs = "".join(lines) if lines else "No application logs yet."
+        except FileNotFoundError:
             app_logs = "Application log file not found."
             log_stats["app_log_size"] = "N/A"
 
-        if deploy_log_file.exists():
-            with open(deploy_log_file, "r") as f:
-                lines = f.readlines()
-                deploy_logs = (
-                    "".join(lines[-100:]) if lines else "No deployment logs yet."
-                )
-
-            # Get file stats
-            stat = deploy_log_file.stat()
+        try:
+            stat = os.stat(deploy_log_file)
             log_stats["deploy_log_size"] = f"{stat.st_size / 1024:.1f} KB"
             log_stats["last_modified"] = stat.st_mtime
-        else:
+            lines = tail_lines(deploy_log_file, 100)
+            deploy_logs = "".join(lines) if lines else "No deployment logs yet."
+        except FileNotFoundError:
             deploy_logs = "Deployment log file not found."
             log_stats["deploy_log_size"] = "N/A"
 
         # Format last modified time
         if "last_modified" in log_stats:
-            import datetime
-
-            log_stats["last_modified"] = datetime.datetime.fromtimestamp(
+            log_stats["last_modified"] = datetime.fromtimestamp(
                 log_stats["last_modified"]
             ).strftime("%Y-%m-%d %H:%M:%S")
         else:
@@ -310,7 +314,7 @@ def deploy_project():
             flash("Project ID is required", "error")
             return redirect(url_for("main.projects_ui"))
 
-        service = services.Services()
+        service = current_app.extensions["services"]
         project = service.db.get_project_by_id(project_id)
 
         if not project:
@@ -320,17 +324,9 @@ def deploy_project():
             return redirect(url_for("main.projects_ui"))
 
         # --- File-based deployment lock to prevent concurrent deployments ---
-        import fcntl
-        import tempfile
-        import os
-        import sqlite3
-        from datetime import datetime, timedelta
-        from pathlib import Path
-
         project_name = project["repo_name"]
-        lock_dir = Path(__file__).parent.parent / "locks"
-        lock_dir.mkdir(exist_ok=True)
-        lock_file_path = lock_dir / f"deploy_{project_name}.lock"
+        _LOCK_DIR.mkdir(exist_ok=True)
+        lock_file_path = _LOCK_DIR / f"deploy_{project_name}.lock"
         lock_file = None
 
         try:
@@ -361,85 +357,32 @@ def deploy_project():
             flash(error_msg, "warning")
             return redirect(url_for("main.project_detail", project_name=project_name))
 
-        db_path = service.db.db_path
-        ten_minutes_ago = datetime.now() - timedelta(minutes=10)
-        ten_minutes_ago_str = ten_minutes_ago.strftime("%Y-%m-%d %H:%M:%S")
-
-        try:
-            with sqlite3.connect(db_path) as conn:
-                cursor = conn.cursor()
-                # Find stuck deployments for this project (deployments started more than 10 minutes ago)
-                cursor.execute(
-                    """
-                    UPDATE deployments 
-                    SET status='failed', error_message='Auto-failed: stuck deployment (timeout)' 
-                    WHERE project_id=? AND status='started' AND deploy_time < ?
-                """,
-                    (project_id, ten_minutes_ago_str),
-                )
-
-                rows_updated = cursor.rowcount
-                if rows_updated > 0:
-                    logging.info(
-                        f"Auto-failed {rows_updated} stuck deployments for project {project_id}"
-                    )
-
-                conn.commit()
-        except Exception as e:
-            logging.error(f"Error auto-failing stuck deployments: {e}")
-
-        # Check if a deployment is already in progress for this project (after cleanup)
-        # Use a database transaction to prevent race conditions
-        deployment_id = None
-        try:
-            with sqlite3.connect(db_path) as conn:
-                conn.execute("BEGIN IMMEDIATE")  # Start exclusive transaction
-                cursor = conn.cursor()
-
-                # Check for active deployments
-                cursor.execute(
-                    """
-                    SELECT id, status, deploy_time FROM deployments 
-                    WHERE project_id=? AND status='started' 
-                    ORDER BY deploy_time DESC LIMIT 1
-                """,
-                    (project_id,),
-                )
+        # deploy_time is stored in UTC, so the cutoff must be too
+        ten_minutes_ago = datetime.now(timezone.utc) - timedelta(minutes=10)
+        service.db.fail_stuck_deployments(
+            project_id, ten_minutes_ago.strftime(TIMESTAMP_FORMAT)
+        )
 
-                active_deployment = cursor.fetchone()
-
-                if active_deployment:
-                    conn.rollback()
-                    error_msg = f"A deployment is already in progress for this project (ID: {active_deployment[0]})"
-                    logging.warning(
-                        f"Deployment blocked for project {project_id}: {error_msg}"
-                    )
-                    if request.is_json:
-                        return jsonify(success=False, error=error_msg), 409
-                    flash(error_msg, "warning")
-                    return redirect(
-                        url_for(
-                            "main.project_detail", project_name=project["repo_name"]
-                        )
-                    )
-
-                # Start new deployment record immediately to prevent race conditions
-                cursor.execute(
-                    """
-                    INSERT INTO deployments (project_id, status, deployment_type)
-                    VALUES (?, 'started', ?)
-                """,
-                    (project_id, deployment_type),
-                )
+        # Check for an active deployment and record the new one in one transaction
+        deployment_id, active_id = service.db.start_deployment(
+            project_id, deployment_type
+        )
 
-                deployment_id = cursor.lastrowid
-                conn.commit()
-                logging.info(
-                    f"Created deployment record {deployment_id} for project {project_id}"
-                )
+        if active_id:
+            _release_deploy_lock(lock_file)
+            error_msg = (
+                f"A deployment is already in progress for this project (ID: {active_id})"
+            )
+            logging.warning(f"Deployment blocked for project {project_id}: {error_msg}")
+            if request.is_json:
+                return jsonify(success=False, error=error_msg), 409
+            flash(error_msg, "warning")
+            return redirect(
+                url_for("main.project_detail", project_name=project["repo_name"])
+            )
 
-        except sqlite3.Error as e:
-            logging.error(f"Database error during deployment check: {e}")
+        if not deployment_id:
+            _release_deploy_lock(lock_file)
             if request.is_json:
                 return jsonify(success=False, error="Database error"), 500
             flash("Database error occurred", "error")
@@ -453,64 +396,25 @@ def deploy_project():
 
         # Note: Deployment record already created above with ID {deployment_id}
 
-        # Choose deployment script
-        current_dir = Path(__file__).parent.parent
-        if deployment_type == "blue-green":
-            deploy_script = current_dir / "blue_green_deploy.sh"
-        else:
-            deploy_script = current_dir / "deploy.sh"
-
-        # Run deployment in background for web UI
-        import threading
-
-        def run_deployment():
-            deployment_lock_file = None
+        # Run deployment on the shared worker pool for web UI
+        def run_deployment(deployment_lock_file):
             try:
-                # Re-open the lock file in this thread to maintain the lock
-                deployment_lock_file = open(lock_file_path, "a")
-                fcntl.flock(
-                    deployment_lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB
-                )
                 logging.info(
-                    f"Background thread acquired deployment lock for project {project_name}"
-                )
-
-                result = subprocess.run(
-                    [str(deploy_script), repo_url],
-                    check=True,
-                    capture_output=True,
-                    text=True,
-                    timeout=600,
+                    f"Background thread took over deployment lock for project {project_name}"
                 )
 
-                # Extract deployment info
-                container_id = None
-                deployment_uuid = None
-
-                for line in result.stdout.strip().split("\n"):
-                    if line.startswith("CONTAINER_ID:"):
-                        container_id = line.split(":", 1)[1].strip()
-                    elif line.startswith("DEPLOYMENT_UUID:"):
-                        deployment_uuid = line.split(":", 1)[1].strip()
+                container_id, deployment_uuid = _deploy(repo_url, deployment_type)
 
                 # Update existing deployment record with success
-                try:
-                    with sqlite3.connect(db_path) as conn:
-                        cursor = conn.cursor()
-                        cursor.execute(
-                            """
-                            UPDATE deployments 
-                            SET status='success', container_id=?, deployment_uuid=?
-                            WHERE id=?
-                        """,
-                            (container_id, deployment_uuid, deployment_id),
-                        )
-                        conn.commit()
-                        logging.info(
-                            f"Updated deployment {deployment_id} with success status"
-                        )
-                except sqlite3.Error as e:
-                    logging.error(f"Error updating deployment status: {e}")
+                service.db.finish_deployment(
+                    deployment_id,
+                    "success",
+                    container_id=container_id,
+                    deployment_uuid=deployment_uuid,
+                )
+                service.publish_deployment_event(
+                    project["id"], "success", deployment_type, container_id
+                )
 
                 logging.info(f"Web UI deployment completed for {project_name}")
 
@@ -519,23 +423,12 @@ def deploy_project():
                 logging.error(error_msg)
 
                 # Update existing deployment record with failure
-                try:
-                    with sqlite3.connect(db_path) as conn:
-                        cursor = conn.cursor()
-                        cursor.execute(
-                            """
-                            UPDATE deployments 
-                            SET status='failed', error_message=?
-                            WHERE id=?
-                        """,
-                            (error_msg, deployment_id),
-                        )
-                        conn.commit()
-                        logging.info(
-                            f"Updated deployment {deployment_id} with failed status"
-                        )
-                except sqlite3.Error as e:
-                    logging.error(f"Error updating deployment status: {e}")
+                service.db.finish_deployment(
+                    deployment_id, "failed", error_message=error_msg
+                )
+                service.publish_deployment_event(
+                    project["id"], "failed", deployment_type
+                )
 
             finally:
                 # Release the file lock when deployment completes
@@ -557,18 +450,20 @@ def deploy_project():
                             f"Error releasing deployment lock from background thread: {e}"
                         )
 
-        # Start deployment in background
-        deployment_thread = threading.Thread(target=run_deployment)
-        deployment_thread.daemon = True
-        deployment_thread.start()
-
-        # Release the main thread's lock immediately since background thread will handle it
-        if lock_file:
-            lock_file.close()
-            lock_file = None
+        # Start deployment in background; the worker now owns the held lock and
+        # releases it when done, so no other deploy can slip in between
+        future = current_app.extensions["deploy_pool"].submit(
+            run_deployment, lock_file
+        )
+        future.add_done_callback(_log_deployment_future(project_name))
+        lock_file = None
 
         if request.is_json:
-            return jsonify(success=True, message="Deployment started successfully")
+            return jsonify(
+                success=True,
+                message="Deployment started successfully",
+                deployment_id=deployment_id,
+            )
 
         flash("Deployment started successfully!", "success")
         return redirect(url_for("main.project_detail", project_name=project_name))
@@ -584,221 +479,376 @@ def deploy_project():
         return redirect(url_for("main.projects_ui"))
 
 
-@bp.route("/webhook", methods=["POST"])
-def webhook():
-    # Verify the webhook signature first
-    signature = request.headers.get("X-Hub-Signature-256")
-    webhook_secret = current_app.config.get("GITHUB_WEBHOOK_SECRET")
+def _release_deploy_lock(lock_file):
+    """Unlock and close a deployment lock file that no worker took over."""
+    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    lock_file.close()
 
-    if not verify_github_webhook(request.get_data(), signature, webhook_secret):
-        logging.warning("Invalid webhook signature received")
-        return jsonify(error="Unauthorized"), 403
 
-    if request.is_json:
-        payload = request.get_json()
+def _stream_deploy_script(deploy_script, repo_url, timeout=600):
+    """
+    Run a deployment script, scanning its combined stdout/stderr as it is produced.
 
-        service = services.Services()
-        processed_data = service.process_webhook(payload)
+    Only the markers and the last DEPLOY_OUTPUT_TAIL_LINES lines are kept in
+    memory; the scripts write their full output to logs/deploy.log themselves.
 
-        if not processed_data["repo_name"]:
-            return jsonify(error="Invalid payload: missing repository name"), 400
+    Returns:
+        tuple: (output_tail, container_id, deployment_uuid)
 
-        # Get or create project in database
-        project = service.get_or_create_project(
-            processed_data["repo_name"], processed_data["repo_url"]
-        )
+    Raises:
+        subprocess.TimeoutExpired: If the script runs longer than ``timeout`` seconds
+        subprocess.CalledProcessError: If the script exits with a non-zero status
+    """
+    args = [deploy_script, repo_url]
+    timed_out = threading.Event()
+    output_tail = deque(maxlen=DEPLOY_OUTPUT_TAIL_LINES)
+    markers = {}
 
-        if not project:
-            logging.error(
-                f"Failed to create/retrieve project: {processed_data['repo_name']}"
-            )
-            return jsonify(error="Database error"), 500
+    with subprocess.Popen(
+        args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1,
+        **_SCRIPT_POPEN_KW,
+    ) as proc:
 
-        # Configure logging to write to ../logs/app.log
-        current_dir = Path(__file__).parent.parent
+        def kill():
+            timed_out.set()
+            _kill_process_group(proc)
 
+        # Reading the pipe blocks, so the timeout is enforced by a timer
+        killer = threading.Timer(timeout, kill)
+        killer.start()
         try:
-            # Log deployment attempt
-            service.log_deployment_status(
-                project["id"], "started", processed_data.get("commit_hash")
-            )
+            for line in proc.stdout:
+                output_tail.append(line)
+                # One scan for the separator; the later of repeated markers wins
+                name, sep, value = line.partition(":")
+                if sep:
+                    field = _OUTPUT_MARKERS.get(name.strip())
+                    if field:
+                        markers[field] = value.strip()
+            returncode = proc.wait()
+        finally:
+            killer.cancel()
+
+    output = "".join(output_tail)
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(args, timeout, output=output)
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, args, output=output)
+
+    return output, markers.get("container_id"), markers.get("deployment_uuid")
+
+
+def _kill_process_group(proc):
+    """Stop a deploy script along with any docker/git processes it started."""
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+    proc.kill()
+
+
+def _deploy(repo_url, deployment_type="blue-green"):
+    """
+    Run the deployment script for a deployment type and pick out its results.
+
+    Returns:
+        tuple: (container_id, deployment_uuid); either may be None
+
+    Raises:
+        subprocess.TimeoutExpired, subprocess.CalledProcessError: As
+        _stream_deploy_script does when the script times out or fails
+    """
+    deploy_script = _SCRIPT_BY_TYPE.get(deployment_type, _DEPLOY_SCRIPT)
+    logging.debug("Using deployment script: %s", deploy_script)
+    logging.debug("Repository URL: %s", repo_url)
+
+    output, container_id, deployment_uuid = _stream_deploy_script(
+        deploy_script, repo_url
+    )
+
+    logging.debug("Deployment script output: %s", output)
+
+    if container_id:
+        logging.info(f"Extracted container ID: {container_id}")
+    if deployment_uuid:
+        logging.info(f"Extracted deployment UUID: {deployment_uuid}")
+
+    # If we can't extract from output, try to get from log file
+    if not container_id or not deployment_uuid:
+        logging.warning(
+            "Could not extract container ID or UUID from script output, checking log file"
+        )
+        try:
+            # Check last 50 lines
+            for line in tail_lines(_DEPLOY_LOG, 50):
+                if not container_id:
+                    # Extract container ID from log line
+                    _, found, value = line.partition("Primary container deployed:")
+                    if found:
+                        container_id = value.strip()
+                        logging.info(f"Extracted container ID from log: {container_id}")
+                        continue
+                if not deployment_uuid:
+                    # Extract UUID from log line
+                    _, found, value = line.partition("Deployment UUID:")
+                    if found:
+                        deployment_uuid = value.strip()
+                        logging.info(
+                            f"Extracted deployment UUID from log: {deployment_uuid}"
+                        )
+                if container_id and deployment_uuid:
+                    break
+        except Exception as log_e:
+            logging.warning(f"Could not read deploy log: {log_e}")
 
-            # Run the blue-green deployment script by default
-            deploy_script = current_dir / "blue_green_deploy.sh"
+    return container_id, deployment_uuid
 
-            logging.info(
-                f"Starting blue-green deployment for {processed_data['repo_name']}"
-            )
-            logging.debug(f"Using deployment script: {deploy_script}")
-            logging.debug(f"Repository URL: {processed_data['repo_url']}")
 
-            result = subprocess.run(
-                [str(deploy_script), processed_data["repo_url"]],
-                check=True,
-                capture_output=True,
-                text=True,
-                timeout=600,  # 10 minute timeout
-            )
+def _run_deploy_and_log(
+    service, project, repo_url, deployment_type="blue-green", commit_hash=None
+):
+    """Run a project's deployment script on a worker thread and log the outcome."""
+    repo_name = project["repo_name"]
+    label = deployment_type.title()
+    error_msg = None
+    try:
+        # Log deployment attempt here, so the request thread does no DB write
+        service.log_deployment_status(
+            project["id"], "started", commit_hash, deployment_type=deployment_type
+        )
 
-            logging.debug(f"Deployment script stdout: {result.stdout}")
-            logging.debug(f"Deployment script stderr: {result.stderr}")
-
-            # Extract container ID and deployment UUID from the script's output
-            container_id = None
-            deployment_uuid = None
-
-            # Parse both stdout and stderr for the output markers
-            full_output = result.stdout + "\n" + result.stderr
-
-            for line in full_output.strip().split("\n"):
-                line = line.strip()
-                if line.startswith("CONTAINER_ID:"):
-                    container_id = line.split(":", 1)[1].strip()
-                    logging.info(f"Extracted container ID: {container_id}")
-                elif line.startswith("DEPLOYMENT_UUID:"):
-                    deployment_uuid = line.split(":", 1)[1].strip()
-                    logging.info(f"Extracted deployment UUID: {deployment_uuid}")
-
-            # If we can't extract from output, try to get from log file
-            if not container_id or not deployment_uuid:
-                logging.warning(
-                    "Could not extract container ID or UUID from script output, checking log file"
-                )
-                log_file_path = current_dir / "logs" / "deploy.log"
-                try:
-                    with open(log_file_path, "r") as log_file:
-                        log_lines = log_file.readlines()[-50:]  # Check last 50 lines
-                        for line in log_lines:
-                            if (
-                                "Primary container deployed:" in line
-                                and not container_id
-                            ):
-                                # Extract container ID from log line
-                                parts = line.split("Primary container deployed:")
-                                if len(parts) > 1:
-                                    container_id = parts[1].strip()
-                                    logging.info(
-                                        f"Extracted container ID from log: {container_id}"
-                                    )
-                            elif "Deployment UUID:" in line and not deployment_uuid:
-                                # Extract UUID from log line
-                                parts = line.split("Deployment UUID:")
-                                if len(parts) > 1:
-                                    deployment_uuid = parts[1].strip()
-                                    logging.info(
-                                        f"Extracted deployment UUID from log: {deployment_uuid}"
-                                    )
-                except Exception as log_e:
-                    logging.warning(f"Could not read deploy log: {log_e}")
-
-            # Update project with new container information
-            if container_id:
-                service.update_project_deployment_info(
-                    processed_data["repo_name"], container_id=container_id
-                )
+        logging.info(f"Starting {deployment_type} deployment for {repo_name}")
+        container_id, deployment_uuid = _deploy(repo_url, deployment_type)
+
+        # Log successful deployment; this also records the project's new container
+        service.log_deployment_status(
+            project["id"],
+            "success",
+            commit_hash,
+            container_id=container_id,
+            deployment_uuid=deployment_uuid,
+            deployment_type=deployment_type,
+        )
 
-            # Log successful deployment
-            service.log_deployment_status(
-                project["id"],
-                "success",
-                processed_data.get("commit_hash"),
-                container_id=container_id,
-                deployment_uuid=deployment_uuid,
-                deployment_type="blue-green",
-            )
+        logging.info(f"{label} deployment completed successfully for {repo_name}")
+        logging.info(
+            f"Container ID: {container_id}, Deployment UUID: {deployment_uuid}"
+        )
 
-            logging.info(
-                f"Blue-green deployment completed successfully for {processed_data['repo_name']}"
-            )
-            logging.info(
-                f"Container ID: {container_id}, Deployment UUID: {deployment_uuid}"
-            )
+    except subprocess.TimeoutExpired as e:
+        error_msg = f"Deployment timed out after 10 minutes: {str(e)}"
+        logging.error(error_msg)
 
-            return (
-                jsonify(
-                    message="Webhook received and blue-green deployment completed successfully",
-                    repository=processed_data["repo_name"],
-                    project_id=project["id"],
-                    container_id=container_id,
-                    deployment_uuid=deployment_uuid,
-                    deployment_type="blue-green",
-                ),
-                200,
-            )
+    except subprocess.CalledProcessError as e:
+        error_msg = f"{label} deployment failed: {e.output if e.output else str(e)}"
+        logging.error(error_msg)
+        logging.error(f"Return code: {e.returncode}")
 
-        except subprocess.TimeoutExpired as e:
-            error_msg = f"Deployment timed out after 10 minutes: {str(e)}"
-            logging.error(error_msg)
+    except Exception as e:
+        error_msg = f"Unexpected error during {deployment_type} deployment: {str(e)}"
+        logging.error(error_msg, exc_info=True)  # Include stack trace
+
+    # Log failed deployment
+    if error_msg:
+        service.log_deployment_status(
+            project["id"],
+            "failed",
+            commit_hash,
+            error_message=error_msg,
+            deployment_type=deployment_type,
+        )
 
-            # Log failed deployment
-            service.log_deployment_status(
-                project["id"],
-                "failed",
-                processed_data.get("commit_hash"),
-                error_message=error_msg,
-                deployment_type="blue-green",
-            )
 
-            return jsonify(error="Deployment timed out", details=error_msg), 500
+def _run_webhook_deployments(service, project, repo_url, commit_hash):
+    """Deploy a repo for a webhook, then any push that arrived while it ran."""
+    repo_name = project["repo_name"]
+    try:
+        while True:
+            _run_deploy_and_log(service, project, repo_url, "blue-green", commit_hash)
+            with _webhook_deploys_lock:
+                pending = _webhook_deploys_pending.pop(repo_name, None)
+                if pending is None:
+                    _webhook_deploys_running.discard(repo_name)
+                    return
+            repo_url, commit_hash = pending
+    except BaseException:
+        with _webhook_deploys_lock:
+            _webhook_deploys_running.discard(repo_name)
+            _webhook_deploys_pending.pop(repo_name, None)
+        raise
 
-        except subprocess.CalledProcessError as e:
-            error_msg = (
-                f"Blue-green deployment failed: {e.stderr if e.stderr else str(e)}"
-            )
-            logging.error(error_msg)
-            logging.error(
-                f"Deployment stdout: {e.stdout if hasattr(e, 'stdout') and e.stdout else 'N/A'}"
-            )
-            logging.error(f"Return code: {e.returncode}")
-
-            # Log failed deployment
-            service.log_deployment_status(
-                project["id"],
-                "failed",
-                processed_data.get("commit_hash"),
-                error_message=error_msg,
-                deployment_type="blue-green",
-            )
 
-            return jsonify(error="Blue-green deployment failed", details=error_msg), 500
+def _log_deployment_future(repo_name):
+    """Build a done-callback that reports deployments which crashed the worker."""
 
-        except Exception as e:
-            error_msg = f"Unexpected error during blue-green deployment: {str(e)}"
-            logging.error(error_msg, exc_info=True)  # Include stack trace
-
-            # Log failed deployment
-            service.log_deployment_status(
-                project["id"],
-                "failed",
-                processed_data.get("commit_hash"),
-                error_message=error_msg,
+    def callback(future):
+        error = future.exception()
+        if error is not None:
+            logging.error(f"Deployment worker for {repo_name} crashed: {error}")
+
+    return callback
+
+
+@bp.route("/webhook", methods=["POST"])
+def webhook():
+    # Verify the webhook signature first
+    signature = request.headers.get("X-Hub-Signature-256")
+    webhook_secret = current_app.config.get("GITHUB_WEBHOOK_SECRET")
+
+    # Deliveries that cannot be verified are refused without reading the body
+    if not signature:
+        logging.warning("No signature header found in webhook request")
+        return "", 403
+    if not webhook_secret:
+        logging.error("No webhook secret configured")
+        return "", 403
+
+    # Read the body once; it is both the HMAC input and the JSON to parse
+    body = request.get_data(cache=False)
+
+    # Rejected deliveries get an empty body; GitHub does not read it
+    if not verify_github_webhook(body, signature, webhook_secret):
+        logging.warning("Invalid webhook signature received")
+        return "", 403
+
+    try:
+        payload = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        payload = None
+    if not isinstance(payload, dict):
+        return "", 400
+
+    # Check for a repository name before touching the services or database
+    repository = payload.get("repository")
+    if not isinstance(repository, dict) or not repository.get("name"):
+        return "", 400
+
+    service = current_app.extensions["services"]
+    webhook_data = service.process_webhook(payload)
+    repo_name = webhook_data.repo_name
+
+    # Get or create project in database
+    project = service.get_or_create_project(repo_name, webhook_data.repo_url)
+
+    if not project:
+        logging.error("Failed to create/retrieve project: %s", repo_name)
+        return jsonify(error="Database error"), 500
+
+    target = (webhook_data.repo_url, webhook_data.commit_hash)
+
+    # A push that lands while this repo is deploying replaces any push already
+    # waiting; the running worker deploys the latest one when it finishes
+    with _webhook_deploys_lock:
+        coalesced = repo_name in _webhook_deploys_running
+        if coalesced:
+            _webhook_deploys_pending[repo_name] = target
+        else:
+            _webhook_deploys_running.add(repo_name)
+
+    if coalesced:
+        logging.info(
+            "Deployment for %s already running; queued the latest push after it",
+            repo_name,
+        )
+        return (
+            jsonify(
+                message="Webhook received and coalesced into the running deployment",
+                repository=repo_name,
+                project_id=project["id"],
                 deployment_type="blue-green",
-            )
+            ),
+            202,
+        )
 
-            return jsonify(error="Internal server error during deployment"), 500
+    # Deploy on the shared worker pool so GitHub gets its response right away
+    future = current_app.extensions["deploy_pool"].submit(
+        _run_webhook_deployments, service, project, *target
+    )
+    future.add_done_callback(_log_deployment_future(repo_name))
 
-    else:
-        return jsonify(error="Request was not JSON"), 400
+    return (
+        jsonify(
+            message="Webhook received and blue-green deployment queued",
+            repository=repo_name,
+            project_id=project["id"],
+            deployment_type="blue-green",
+        ),
+        202,
+    )
 
 
 @bp.route("/")
 def index():
     """Redirect to dashboard."""
-    return redirect(url_for("main.dashboard"))
+    response = redirect(url_for("main.dashboard"))
+    # The target never changes, so browsers may reuse the redirect
+    response.cache_control.public = True
+    response.cache_control.max_age = INDEX_REDIRECT_MAX_AGE
+    return response
+
+
+def _etag_for(service, name, *tables):
+    """Build an ETag from the version numbers of the tables a response reads."""
+    versions = [service.db.get_table_version(table) for table in tables]
+    if None in versions:
+        return None
+    return "-".join([name] + [str(version) for version in versions])
+
+
+def _matching_etag(etag):
+    """Return the If-None-Match tag that matches an ETag, or None.
+
+    Flask-Compress adds ":<encoding>" to the ETag of compressed responses, so a
+    tag with that suffix matches too and is returned as the client sent it.
+    """
+    if_none_match = request.if_none_match
+    if if_none_match.star_tag:
+        return etag
+    for tag in if_none_match:
+        if tag == etag or tag.rpartition(":")[0] == etag:
+            return tag
+    return None
+
+
+def _not_modified(etag):
+    """Build a 304 that repeats the validator the client already holds."""
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def _json_with_etag(etag, **data):
+    """jsonify the data and tag the response with the given ETag."""
+    response = jsonify(**data)
+    if etag:
+        response.set_etag(etag)
+    return response
 
 
 @bp.route("/projects")
 def list_projects():
     """List all projects being managed."""
     try:
-        service = services.Services()
+        service = current_app.extensions["services"]
+
+        # Pollers that already have the current list skip the query and encoding
+        etag = _etag_for(service, "projects", "projects")
+        matched_etag = etag and _matching_etag(etag)
+        if matched_etag:
+            return _not_modified(matched_etag)
+
         projects = service.db.get_all_projects()
 
         # Add potential URLs for each project
+        url_map = service.get_project_urls_bulk([p["repo_name"] for p in projects])
         for project in projects:
-            project["urls"] = service.get_project_urls(project["repo_name"])
+            project["urls"] = url_map[project["repo_name"]]
 
-        return jsonify(projects=projects), 200
+        return _json_with_etag(etag, projects=projects), 200
     except Exception as e:
         logging.error(f"Error listing projects: {str(e)}")
         return jsonify(error="Failed to retrieve projects"), 500
@@ -808,7 +858,7 @@ def list_projects():
 def get_project_urls(project_name):
     """Get the Traefik URLs for a specific project."""
     try:
-        service = services.Services()
+        service = current_app.extensions["services"]
         project = service.db.get_project_by_repo_name(project_name)
 
         if not project:
@@ -819,7 +869,7 @@ def get_project_urls(project_name):
             jsonify(
                 project=project_name,
                 urls=urls,
-                traefik_dashboard="http://localhost:8080",
+                traefik_dashboard=current_app.config["TRAEFIK_DASHBOARD_URL"],
             ),
             200,
         )
@@ -832,20 +882,39 @@ def get_project_urls(project_name):
 def get_project_deployments(project_name):
     """Get deployment history for a specific project."""
     try:
-        service = services.Services()
+        service = current_app.extensions["services"]
         project = service.db.get_project_by_repo_name(project_name)
 
         if not project:
             return jsonify(error="Project not found"), 404
 
-        deployments = service.db.get_deployment_history(project["id"])
+        limit = request.args.get("limit", DEPLOYMENT_HISTORY_PAGE_SIZE, type=int)
+        limit = min(max(limit, 1), DEPLOYMENT_HISTORY_MAX_PAGE_SIZE)
+        offset = max(request.args.get("offset", 0, type=int), 0)
+
+        etag = _etag_for(
+            service,
+            f"project-{project['id']}-{limit}-{offset}",
+            "projects",
+            "deployments",
+        )
+        matched_etag = etag and _matching_etag(etag)
+        if matched_etag:
+            return _not_modified(matched_etag)
+
+        deployments = service.db.get_deployment_history(project["id"], limit, offset)
 
         return (
-            jsonify(
+            _json_with_etag(
+                etag,
                 project=project_name,
                 project_id=project["id"],
-                deployments=deployments,
-                total_deployments=len(deployments),
+                deployments=rows_to_dicts(deployments),
+                total_deployments=service.db.get_project_deployment_count(
+                    project["id"]
+                ),
+                limit=limit,
+                offset=offset,
             ),
             200,
         )
@@ -858,10 +927,23 @@ def get_project_deployments(project_name):
 def get_recent_deployments():
     """Get recent deployments across all projects."""
     try:
-        service = services.Services()
+        service = current_app.extensions["services"]
+
+        etag = _etag_for(service, "deployments", "projects", "deployments")
+        matched_etag = etag and _matching_etag(etag)
+        if matched_etag:
+            return _not_modified(matched_etag)
+
         deployments = service.db.get_recent_deployments()
 
-        return jsonify(deployments=deployments, total_shown=len(deployments)), 200
+        return (
+            _json_with_etag(
+                etag,
+                deployments=rows_to_dicts(deployments),
+                total_shown=len(deployments),
+            ),
+            200,
+        )
     except Exception as e:
         logging.error(f"Error getting recent deployments: {str(e)}")
         return jsonify(error="Failed to retrieve recent deployments"), 500
@@ -871,7 +953,7 @@ def get_recent_deployments():
 def delete_project(project_name):
     """Delete a project completely."""
     try:
-        service = services.Services()
+        service = current_app.extensions["services"]
         project = service.db.get_project_by_repo_name(project_name)
 
         if not project:
@@ -888,9 +970,6 @@ def delete_project(project_name):
 
         # Stop and remove all containers for this project
         try:
-            import subprocess
-            from pathlib import Path
-
             # Get all containers with the project label
             result = subprocess.run(
                 [
@@ -905,6 +984,7 @@ def delete_project(project_name):
                 capture_output=True,
                 text=True,
                 timeout=30,
+                close_fds=False,
             )
 
             if result.returncode == 0 and result.stdout.strip():
@@ -918,12 +998,14 @@ def delete_project(project_name):
                             ["docker", "stop", container_name],
                             capture_output=True,
                             timeout=30,
+                            close_fds=False,
                         )
                         # Remove container
                         subprocess.run(
                             ["docker", "rm", container_name],
                             capture_output=True,
                             timeout=30,
+                            close_fds=False,
                         )
                         logging.info(f"Removed container: {container_name}")
             else:
@@ -940,12 +1022,9 @@ def delete_project(project_name):
 
         # Remove project files from projects_data directory
         try:
-            current_dir = Path(__file__).parent.parent
-            project_dir = current_dir / "projects_data" / project_name
+            project_dir = _PROJECTS_DATA_DIR / project_name
 
             if project_dir.exists():
-                import shutil
-
                 shutil.rmtree(project_dir)
                 logging.info(f"Removed project directory: {project_dir}")
             else:
@@ -1017,31 +1096,27 @@ def delete_project(project_name):
 def view_logs():
     """View recent application and deployment logs."""
     try:
-        current_dir = Path(__file__).parent.parent
-
+        flush_log_buffer()
         # Read recent app logs
-        app_log_file = current_dir / "logs" / "app.log"
-        deploy_log_file = current_dir / "logs" / "deploy.log"
+        app_log_file = _APP_LOG
+        deploy_log_file = _DEPLOY_LOG
 
         app_logs = ""
         deploy_logs = ""
 
-        if app_log_file.exists():
-            with open(app_log_file, "r") as f:
-                lines = f.readlines()
-                # Get last 50 lines
-                app_logs = "".join(lines[-50:]) if lines else "No application logs yet."
-        else:
+        # Opening the file is the existence check
+        try:
+            # Get last 50 lines
+            lines = tail_lines(app_log_file, 50)
+            app_logs = "".join(lines) if lines else "No application logs yet."
+        except FileNotFoundError:
             app_logs = "Application log file not found."
 
-        if deploy_log_file.exists():
-            with open(deploy_log_file, "r") as f:
-                lines = f.readlines()
-                # Get last 100 lines
-                deploy_logs = (
-                    "".join(lines[-100:]) if lines else "No deployment logs yet."
-                )
-        else:
+        try:
+            # Get last 100 lines
+            lines = tail_lines(deploy_log_file, 100)
+            deploy_logs = "".join(lines) if lines else "No deployment logs yet."
+        except FileNotFoundError:
             deploy_logs = "Deployment log file not found."
 
         return render_template(
@@ -1051,3 +1126,62 @@ def view_logs():
     except Exception as e:
         logging.error(f"Error viewing logs: {str(e)}")
         return jsonify(error="Failed to load logs"), 500
+
+
+@bp.route("/logs/raw/<which>")
+def view_raw_log(which):
+    """Serve a whole log file as plain text, honouring conditional requests."""
+    log_file = _RAW_LOGS.get(which)
+    if log_file is None:
+        return jsonify(error="Unknown log"), 404
+
+    if which == "app":
+        flush_log_buffer()
+
+    # Werkzeug streams the file itself and answers If-Modified-Since with a 304;
+    # its stat of the file doubles as the existence check
+    try:
+        return send_file(log_file, mimetype="text/plain", conditional=True)
+    except FileNotFoundError:
+        return jsonify(error="Log file not found"), 404
+
+
+@bp.route("/deploys/stream")
+def deployment_events():
+    """Stream deployment status changes as Server-Sent Events."""
+    # Every open stream holds a worker thread, so refuse streams past the limit
+    # rather than leave no threads for ordinary requests
+    streams = current_app.extensions["deploy_event_streams"]
+    if not streams.acquire(blocking=False):
+        return (
+            jsonify(error="Too many open event streams"),
+            503,
+            {"Retry-After": str(DEPLOY_EVENTS_KEEPALIVE)},
+        )
+
+    events = current_app.extensions["services"].events
+    subscription = events.subscribe()
+
+    def generate():
+        # An immediate comment lets the browser know the stream is open
+        yield ": connected\n\n"
+        while True:
+            try:
+                event = subscription.get(timeout=DEPLOY_EVENTS_KEEPALIVE)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            yield f"data: {orjson.dumps(event).decode()}\n\n"
+
+    def close():
+        events.unsubscribe(subscription)
+        streams.release()
+
+    response = Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # Runs when the server closes the response, even if it was never iterated
+    response.call_on_close(close)
+    return response
@@ -1,19 +1,69 @@
 import logging
 import re
-import uuid
-from datetime import datetime
-from .models import DatabaseManager
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from .models import DatabaseManager, rows_to_dicts
+from .utils import EventBroadcaster
+
+# Characters that may not appear in a project's subdomain
+_SUBDOMAIN_RE = re.compile(r"[^a-z0-9-]")
+
+# Seconds a `docker ps` listing is reused by status checks
+CONTAINER_STATUS_TTL = 5.0
+
+
+@dataclass(slots=True, frozen=True)
+class WebhookData:
+    """Repository information taken from a webhook payload."""
+
+    repo_name: str | None
+    repo_url: str | None
+    commit_hash: str | None = None
+
+
+@lru_cache(maxsize=256)
+def _project_urls(repo_name):
+    """Build the potential Traefik URLs for a project, once per repo name."""
+    domain_suffix = "localhost"
+
+    # Clean project name for subdomain
+    clean_name = _SUBDOMAIN_RE.sub("-", repo_name.lower())
+
+    # For now, we'll assume common service names
+    # In a more advanced implementation, this could parse the actual compose file
+    common_services = ["web", "app", "frontend", "backend", "api", "server"]
+
+    # Generate potential URLs
+    # Primary URL (just project name)
+    urls = [f"http://{clean_name}.{domain_suffix}"]
+
+    # Service-specific URLs
+    for service in common_services:
+        urls.append(f"http://{clean_name}-{service}.{domain_suffix}")
+
+    return tuple(urls)
 
 
 class Services:
-    def __init__(self):
-        self.db = DatabaseManager()
+    def __init__(self, db=None):
+        self.db = db if db is not None else DatabaseManager()
         self.logger = logging.getLogger(__name__)
+        # Deployment status changes, streamed to browsers by /deploys/stream
+        self.events = EventBroadcaster()
+        # Last running-container listing as (monotonic time, containers); the
+        # generation is bumped whenever a deployment changes what is running
+        self._running_cache = None
+        self._running_generation = 0
+        self._running_lock = threading.Lock()
 
     def process_webhook(self, repository_payload):
         """Process the webhook payload and return repository information."""
         self.logger.info("Processing webhook payload")
-        self.logger.debug(f"Webhook payload keys: {list(repository_payload.keys())}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Webhook payload keys: %s", list(repository_payload))
 
         repo_name = repository_payload.get("repository", {}).get("name")
         repo_url = repository_payload.get("repository", {}).get("html_url")
@@ -22,15 +72,11 @@ class Services:
         commit_hash = None
         if "head_commit" in repository_payload and repository_payload["head_commit"]:
             commit_hash = repository_payload["head_commit"].get("id")
-            self.logger.info(f"Webhook triggered by commit: {commit_hash[:8]}...")
+            self.logger.info("Webhook triggered by commit: %.8s...", commit_hash)
 
-        self.logger.info(f"Processed webhook for repository: {repo_name}")
+        self.logger.info("Processed webhook for repository: %s", repo_name)
 
-        return {
-            "repo_name": repo_name,
-            "repo_url": repo_url,
-            "commit_hash": commit_hash,
-        }
+        return WebhookData(repo_name, repo_url, commit_hash)
 
     def get_or_create_project(self, repo_name, repo_url):
         """Get existing project or create a new one."""
@@ -110,7 +156,16 @@ class Services:
         )
 
         try:
-            self.db.log_deployment(
+            # A success with a new container is committed together with the
+            # project's container ID; failures are written immediately rather
+            # than left in the batch buffer
+            if status == "success" and container_id:
+                log_deployment = self.db.log_deployment_and_update_container
+            elif status == "failed":
+                log_deployment = self.db.log_deployment_sync
+            else:
+                log_deployment = self.db.log_deployment
+            log_deployment(
                 project_id,
                 status,
                 commit_hash,
@@ -121,11 +176,14 @@ class Services:
             )
 
             if status == "success" and container_id:
-                self.db.update_project_container_id(project_id, container_id)
                 self.logger.info(
                     f"Updated project {project_id} with container ID: {container_id}"
                 )
 
+            self.publish_deployment_event(
+                project_id, status, deployment_type, container_id=container_id
+            )
+
             # Additional logging for debugging
             if status == "started":
                 self.logger.info(
@@ -153,37 +211,45 @@ class Services:
                 f"Failed to log deployment status: {str(e)}", exc_info=True
             )
 
+    def publish_deployment_event(
+        self, project_id, status, deployment_type="blue-green", container_id=None
+    ):
+        """Tell stream subscribers that a project's deployment changed status."""
+        # A finished deployment starts or replaces containers
+        with self._running_lock:
+            self._running_cache = None
+            self._running_generation += 1
+        self.events.publish(
+            {
+                "project_id": project_id,
+                "status": status,
+                "deployment_type": deployment_type,
+                "container_id": container_id,
+            }
+        )
+
     def get_project_urls(self, repo_name):
         """Generate Traefik URLs for a project's services."""
         self.logger.debug(f"Generating URLs for project: {repo_name}")
 
-        urls = []
-        domain_suffix = "localhost"
-
-        # Clean project name for subdomain
-        clean_name = re.sub(r"[^a-z0-9-]", "-", repo_name.lower())
-        self.logger.debug(f"Clean project name for URLs: {clean_name}")
-
-        # For now, we'll assume common service names
-        # In a more advanced implementation, this could parse the actual compose file
-        common_services = ["web", "app", "frontend", "backend", "api", "server"]
-
-        # Generate potential URLs
-        # Primary URL (just project name)
-        primary_url = f"http://{clean_name}.{domain_suffix}"
-        urls.append(primary_url)
-        self.logger.debug(f"Added primary URL: {primary_url}")
-
-        # Service-specific URLs
-        for service in common_services:
-            service_url = f"http://{clean_name}-{service}.{domain_suffix}"
-            urls.append(service_url)
+        urls = self._build_project_urls(repo_name)
 
         self.logger.info(
             f"Generated {len(urls)} potential URLs for project {repo_name}"
         )
         return urls
 
+    def get_project_urls_bulk(self, repo_names):
+        """Generate Traefik URLs for several projects, keyed by repo name."""
+        url_map = {name: self._build_project_urls(name) for name in repo_names}
+        self.logger.debug(f"Generated potential URLs for {len(url_map)} projects")
+        return url_map
+
+    def _build_project_urls(self, repo_name):
+        """Build the potential Traefik URLs for a project."""
+        # URLs depend only on the name; callers get their own list to modify
+        return list(_project_urls(repo_name))
+
     def get_deployment_metrics(self, repo_name=None):
         """Get deployment metrics and statistics."""
         try:
@@ -201,15 +267,15 @@ class Services:
 
                 return {
                     "project": project,
-                    "deployments": deployments,
-                    "total_deployments": len(deployments),
+                    "deployments": rows_to_dicts(deployments),
+                    "total_deployments": self.db.get_project_deployment_count(
+                        project["id"]
+                    ),
                 }
             else:
                 # Get overall metrics
                 projects = self.db.get_all_projects()
-                total_deployments = sum(
-                    len(self.db.get_deployment_history(p["id"])) for p in projects
-                )
+                total_deployments = self.db.get_deployment_count()
 
                 self.logger.info(
                     f"Retrieved metrics: {len(projects)} projects, {total_deployments} total deployments"
@@ -226,53 +292,71 @@ class Services:
             )
             return None
 
-    def check_container_status(self, project):
-        """Check if the project's containers are actually running."""
-        if not project.get("container_id"):
-            return False
-
+    def get_project_status(self, project):
+        """Get the actual status of a project by checking if containers are running."""
+        return self.get_project_statuses([project])[0]
+
+    def get_project_statuses(self, projects):
+        """Get the actual status of several projects with a single docker call."""
+        if not any(project.get("container_id") for project in projects):
+            return ["stopped"] * len(projects)
+
+        running = self._running_containers()
+        statuses = []
+        for project in projects:
+            container_id = project.get("container_id")
+            if not container_id or running is None:
+                statuses.append("stopped")
+            # Deploy scripts record either a container ID (maybe short) or a name
+            elif any(
+                full_id.startswith(container_id) or container_id in names
+                for full_id, names in running
+            ):
+                statuses.append("running")
+            else:
+                self.logger.debug(
+                    f"Container {container_id} for project {project['repo_name']} is not running"
+                )
+                # Update the database to clear the container_id since it's not running
+                self.db.update_project_container_id(project["id"], None)
+                statuses.append("stopped")
+        return statuses
+
+    def _running_containers(self):
+        """List running containers as (full ID, names); None if docker can't be run."""
+        with self._running_lock:
+            cached = self._running_cache
+            generation = self._running_generation
+        if cached and time.monotonic() - cached[0] < CONTAINER_STATUS_TTL:
+            return cached[1]
+
+        running = self._list_running_containers()
+        if running is not None:
+            with self._running_lock:
+                # Don't store a listing taken before a deployment finished
+                if generation == self._running_generation:
+                    self._running_cache = (time.monotonic(), running)
+        return running
+
+    def _list_running_containers(self):
+        """Ask docker for the running containers; see _running_containers."""
         try:
-            import subprocess
-
-            # Check if the container is running
             result = subprocess.run(
-                [
-                    "docker",
-                    "ps",
-                    "--format",
-                    "{{.Names}}",
-                    "--filter",
-                    f'id={project["container_id"]}',
-                ],
+                ["docker", "ps", "--no-trunc", "--format", "{{.ID}} {{.Names}}"],
                 capture_output=True,
                 text=True,
                 timeout=10,
+                close_fds=False,
             )
-
-            # If the command succeeded and returned output, container is running
-            is_running = result.returncode == 0 and result.stdout.strip() != ""
-
-            if not is_running:
-                self.logger.debug(
-                    f"Container {project['container_id']} for project {project['repo_name']} is not running"
-                )
-                # Update the database to clear the container_id since it's not running
-                self.db.update_project_container_id(project["id"], None)
-
-            return is_running
-
         except Exception as e:
-            self.logger.warning(
-                f"Failed to check container status for {project['repo_name']}: {str(e)}"
-            )
-            return False
+            self.logger.warning(f"Failed to list running containers: {str(e)}")
+            return None
 
-    def get_project_status(self, project):
-        """Get the actual status of a project by checking if containers are running."""
-        if not project.get("container_id"):
-            return "stopped"
+        if result.returncode != 0:
+            return []
 
-        if self.check_container_status(project):
-            return "running"
-        else:
-            return "stopped"
+        running = []
+        for line in result.stdout.splitlines():
+            full_id, _, names = line.partition(" ")
+            running.append((full_id, names.split(",")))
+        return running
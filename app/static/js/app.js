@@ -96,6 +96,9 @@ function startDeployment(projectId, deploymentType) {
     // Show loading notification
     showNotification('Starting deployment...', 'info');
 
+    // Listen before starting, so a quick finish is not missed
+    const finished = reloadWhenDeploymentFinishes(projectId);
+
     // Make deployment request
     fetch('/deploy', {
         method: 'POST',
@@ -111,19 +114,79 @@ function startDeployment(projectId, deploymentType) {
         .then(response => response.json())
         .then(data => {
             if (data.success) {
+                finished.started(data.deployment_id);
                 showNotification('Deployment started successfully!', 'success');
-                // Refresh page after a delay to show updated status
-                setTimeout(() => location.reload(), 2000);
             } else {
+                finished.close();
                 showNotification(data.error || 'Deployment failed', 'danger');
             }
         })
         .catch(error => {
+            finished.close();
             console.error('Deployment error:', error);
             showNotification('Network error during deployment', 'danger');
         });
 }
 
+// Reload the page once the project's deployment succeeds or fails
+function reloadWhenDeploymentFinishes(projectId) {
+    let timer = null;
+    // Without an event stream, refresh after a delay to show updated status
+    const reloadLater = () => { timer = setTimeout(() => location.reload(), 2000); };
+
+    if (!window.EventSource) {
+        reloadLater();
+        return { started: () => {}, close: () => clearTimeout(timer) };
+    }
+
+    const source = new EventSource('/deploys/stream');
+    const reload = () => {
+        source.close();
+        location.reload();
+    };
+
+    // The stream connects in the background, so a quick deployment can finish
+    // before it is subscribed; check its status once both the stream is open
+    // and the deployment ID is known
+    let deploymentId = null;
+    let opened = false;
+    const checkStatus = () => {
+        if (!opened || deploymentId === null) return;
+        fetch('/deployments')
+            .then(response => response.json())
+            .then(data => {
+                const deployment = data.deployments.find(d => d.id === deploymentId);
+                if (deployment && deployment.status !== 'started') reload();
+            })
+            .catch(error => console.error('Deployment status error:', error));
+    };
+
+    source.onopen = () => {
+        opened = true;
+        checkStatus();
+    };
+    source.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        if (String(data.project_id) === String(projectId) && data.status !== 'started') {
+            reload();
+        }
+    };
+    source.onerror = () => {
+        // Refused outright, e.g. too many open streams
+        if (source.readyState === EventSource.CLOSED) reloadLater();
+    };
+    return {
+        started: (id) => {
+            deploymentId = id;
+            checkStatus();
+        },
+        close: () => {
+            source.close();
+            clearTimeout(timer);
+        }
+    };
+}
+
 // Show notification toast using Tailwind classes
 function showNotification(message, type = 'info') {
     const toastContainer = document.getElementById('toastContainer') || createToastContainer();
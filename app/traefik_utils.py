@@ -3,11 +3,46 @@ Docker Compose file modification utilities for Traefik integration.
 """
 
 import yaml
-import os
 import re
 import logging
 from typing import Dict, Any, Optional
 
+# Use libyaml's C parser and emitter when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as _YamlLoader, CSafeDumper as _YamlDumper
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader, SafeDumper as _YamlDumper
+
+# Characters that may not appear in a Traefik router name or subdomain
+_SUBDOMAIN_RE = re.compile(r"[^a-z0-9-]")
+
+# Environment variables that commonly hold a service's port
+_PORT_ENV_VARS = ("PORT", "HTTP_PORT", "SERVER_PORT", "APP_PORT", "WEB_PORT")
+_PORT_ENV_PREFIXES = tuple(f"{name}=" for name in _PORT_ENV_VARS)
+
+# Default ports for common images, checked in order against the image name
+_IMAGE_PORT_HINTS = (
+    ("nginx", 80),
+    ("apache", 80),
+    ("node", 3000),
+    ("express", 3000),
+    ("python", 8000),
+    ("flask", 8000),
+    ("django", 8000),
+    ("tomcat", 8080),
+)
+
+
+def _labels_as_dict(labels) -> Dict[str, str]:
+    """Normalize compose labels, a list of "key=value" strings or a mapping, to a dict."""
+    if isinstance(labels, dict):
+        return labels
+    labels_dict = {}
+    for label in labels or []:
+        key, _, value = str(label).partition("=")
+        labels_dict[key] = value
+    return labels_dict
+
 
 class DockerComposeModifier:
     """Modifies docker-compose.yml files to integrate with Traefik reverse proxy."""
@@ -15,6 +50,8 @@ class DockerComposeModifier:
     def __init__(self, compose_file_path: str, project_name: str):
         self.compose_file_path = compose_file_path
         self.project_name = project_name
+        # Subdomains are "<project>-<service>"; the project part is the same for all
+        self._clean_project = _SUBDOMAIN_RE.sub("-", project_name.lower())
         self.domain_suffix = "localhost"  # Can be configured for production
         self.logger = logging.getLogger(__name__)
 
@@ -30,31 +67,46 @@ class DockerComposeModifier:
                 f"Starting modification of {self.compose_file_path} for project {self.project_name}"
             )
 
-            if not os.path.exists(self.compose_file_path):
+            try:
+                # Read in one go so libyaml scans a single buffer
+                with open(self.compose_file_path, "rb") as file:
+                    original = file.read()
+                compose_data = yaml.load(original, Loader=_YamlLoader)
+            except FileNotFoundError:
                 self.logger.error(
                     f"Docker compose file not found: {self.compose_file_path}"
                 )
                 return False
 
-            with open(self.compose_file_path, "r") as file:
-                compose_data = yaml.safe_load(file)
-
             if not compose_data:
                 self.logger.error("Empty or invalid docker-compose.yml file")
                 return False
 
             # Log original structure
             services_count = len(compose_data.get("services", {}))
-            self.logger.debug(f"Original compose file has {services_count} services")
+            self.logger.debug("Original compose file has %d services", services_count)
 
             # Modify the compose data
             modified_data = self._add_traefik_configuration(compose_data)
 
-            # Write back to file
-            with open(self.compose_file_path, "w") as file:
-                yaml.dump(
-                    modified_data, file, default_flow_style=False, sort_keys=False
+            # Serialize before opening the file, so a dump error can't leave it
+            # truncated, then write it back in one call
+            output = yaml.dump(
+                modified_data,
+                Dumper=_YamlDumper,
+                default_flow_style=False,
+                sort_keys=False,
+            )
+
+            # A file this modifier already wrote comes out the same; leave it be
+            if output.encode("utf-8") == original:
+                self.logger.info(
+                    f"{self.compose_file_path} is already configured for Traefik"
                 )
+                return True
+
+            with open(self.compose_file_path, "w") as file:
+                file.write(output)
 
             self.logger.info(
                 f"Successfully modified {self.compose_file_path} for Traefik integration"
@@ -74,19 +126,13 @@ class DockerComposeModifier:
 
         self.logger.debug("Adding Traefik configuration to compose data")
 
-        # Ensure services exist
-        if "services" not in compose_data:
-            compose_data["services"] = {}
-            self.logger.debug("Created empty services section")
-
-        # Ensure networks section exists
-        if "networks" not in compose_data:
-            compose_data["networks"] = {}
-            self.logger.debug("Created empty networks section")
+        # Ensure services and networks sections exist
+        compose_data.setdefault("services", {})
+        networks = compose_data.setdefault("networks", {})
 
         # Add web-proxy network as external, preserving existing networks
-        if isinstance(compose_data.get("networks"), dict):
-            compose_data["networks"]["web-proxy"] = {"external": True}
+        if isinstance(networks, dict):
+            networks["web-proxy"] = {"external": True}
             self.logger.debug(
                 "Added web-proxy external network to existing network definitions"
             )
@@ -101,7 +147,9 @@ class DockerComposeModifier:
         service_counter = 0
         for service_name, service_config in compose_data["services"].items():
             service_counter += 1
-            self.logger.debug(f"Processing service {service_counter}: {service_name}")
+            self.logger.debug(
+                "Processing service %d: %s", service_counter, service_name
+            )
 
             self._configure_service_for_traefik(
                 service_name, service_config, service_counter
@@ -121,16 +169,10 @@ class DockerComposeModifier:
         if "healthcheck" not in service_config:
             service_config["healthcheck"] = {"disable": True}
             # Add a label to indicate healthcheck is disabled
-            if "labels" not in service_config:
-                service_config["labels"] = []
-            elif isinstance(service_config["labels"], dict):
-                # Convert dict labels to list format if needed
-                labels_list = []
-                for key, value in service_config["labels"].items():
-                    labels_list.append(f"{key}={value}")
-                service_config["labels"] = labels_list
-            service_config["labels"].append("healthcheck.disabled=true")
-            self.logger.debug(f"Disabled healthcheck for {service_name}")
+            labels = _labels_as_dict(service_config.get("labels"))
+            labels["healthcheck.disabled"] = "true"
+            service_config["labels"] = labels
+            self.logger.debug("Disabled healthcheck for %s", service_name)
 
         services_to_ignore = [
             # Databases
@@ -171,79 +213,75 @@ class DockerComposeModifier:
             )
             return
 
-        self.logger.debug(f"Configuring service {service_name} for Traefik")
+        self.logger.debug("Configuring service %s for Traefik", service_name)
 
         # Add web-proxy network to service
         if "networks" not in service_config:
             service_config["networks"] = []
-        elif isinstance(service_config["networks"], dict):
-            # Convert dict format to list format and add web-proxy
-            networks_dict = service_config["networks"].copy()
-            service_config["networks"] = list(networks_dict.keys()) + ["web-proxy"]
-        elif isinstance(service_config["networks"], list):
-            if "web-proxy" not in service_config["networks"]:
-                service_config["networks"].append("web-proxy")
+        elif isinstance(service_config["networks"], (dict, list)):
+            # Convert dict format to list format and add web-proxy; dict.fromkeys
+            # keeps the order and drops a web-proxy that is already listed
+            service_config["networks"] = list(
+                dict.fromkeys([*service_config["networks"], "web-proxy"])
+            )
         else:
             service_config["networks"] = ["web-proxy"]
 
         self.logger.debug(
-            f"Updated networks for {service_name}: {service_config['networks']}"
+            "Updated networks for %s: %s", service_name, service_config["networks"]
         )
 
-        # Ensure labels section exists (now handled above, but keep for Traefik labels)
-        if "labels" not in service_config:
-            service_config["labels"] = []
-        elif isinstance(service_config["labels"], dict):
-            # Convert dict labels to list format
-            labels_list = []
-            for key, value in service_config["labels"].items():
-                labels_list.append(f"{key}={value}")
-            service_config["labels"] = labels_list
+        # Ensure labels section exists as a mapping, so a label the compose file
+        # already sets is replaced rather than repeated
+        if not isinstance(service_config.get("labels"), dict):
+            service_config["labels"] = _labels_as_dict(service_config.get("labels"))
             self.logger.debug(
-                f"Converted labels from dict to list format for {service_name}"
+                "Converted labels from list to dict format for %s", service_name
             )
 
         # Remove ports that would conflict (let Traefik handle routing)
         exposed_ports = self._extract_and_remove_ports(service_config)
 
         # Generate unique subdomain for this service
-        subdomain = f"{self.project_name}-{service_name}".lower()
-        subdomain = re.sub(r"[^a-z0-9-]", "-", subdomain)
+        clean_service = _SUBDOMAIN_RE.sub("-", service_name.lower())
+        subdomain = f"{self._clean_project}-{clean_service}"
+        host = f"{subdomain}.{self.domain_suffix}"
+        router = f"traefik.http.routers.{subdomain}"
 
         # Add Traefik labels
-        traefik_labels = [
-            "traefik.enable=true",
-            f"traefik.http.routers.{subdomain}.rule=Host(`{subdomain}.{self.domain_suffix}`)",
-            f"traefik.http.routers.{subdomain}.entrypoints=web",
-            "traefik.docker.network=web-proxy",
-            f"project={self.project_name}",  # Add project label for blue-green identification
-        ]
+        traefik_labels = {
+            "traefik.enable": "true",
+            f"{router}.rule": f"Host(`{host}`)",
+            f"{router}.entrypoints": "web",
+            "traefik.docker.network": "web-proxy",
+            "project": self.project_name,  # Add project label for blue-green identification
+        }
 
         # If we found exposed ports, use the first one for Traefik service
         if exposed_ports:
             primary_port = exposed_ports[0]
-            traefik_labels.append(
-                f"traefik.http.services.{subdomain}.loadbalancer.server.port={primary_port}"
-            )
+            traefik_labels[
+                f"traefik.http.services.{subdomain}.loadbalancer.server.port"
+            ] = str(primary_port)
             self.logger.info(
-                f"Service {service_name} will be available at: http://{subdomain}.{self.domain_suffix} (port {primary_port})"
+                f"Service {service_name} will be available at: http://{host} (port {primary_port})"
             )
         else:
             # Try to detect common ports or use 80 as default
             detected_port = self._detect_port_from_service(service_config)
             default_port = detected_port if detected_port else 80
 
-            traefik_labels.append(
-                f"traefik.http.services.{subdomain}.loadbalancer.server.port={default_port}"
-            )
+            traefik_labels[
+                f"traefik.http.services.{subdomain}.loadbalancer.server.port"
+            ] = str(default_port)
             self.logger.info(
-                f"Service {service_name} will be available at: http://{subdomain}.{self.domain_suffix} (using detected/default port {default_port})"
+                f"Service {service_name} will be available at: http://{host} (using detected/default port {default_port})"
             )
 
         # Add labels to service
-        service_config["labels"].extend(traefik_labels)
+        service_config["labels"].update(traefik_labels)
         self.logger.debug(
-            f"Added {len(traefik_labels)} Traefik labels to {service_name}"
+            "Added %d Traefik labels to %s", len(traefik_labels), service_name
         )
 
     def _extract_and_remove_ports(self, service_config: Dict[str, Any]) -> list:
@@ -252,15 +290,12 @@ class DockerComposeModifier:
 
         if "ports" in service_config:
             ports = service_config["ports"]
-            self.logger.debug(f"Found ports configuration: {ports}")
+            self.logger.debug("Found ports configuration: %s", ports)
 
             for port_mapping in ports:
                 if isinstance(port_mapping, str):
-                    # Handle "host:container" or just "port" format
-                    if ":" in port_mapping:
-                        container_port = port_mapping.split(":")[1]
-                    else:
-                        container_port = port_mapping
+                    # Handle "[ip:]host:container" or just "port" format
+                    container_port = port_mapping.rpartition(":")[2]
                 elif isinstance(port_mapping, int):
                     container_port = str(port_mapping)
                 elif isinstance(port_mapping, dict):
@@ -269,10 +304,13 @@ class DockerComposeModifier:
                 else:
                     continue
 
-                # Extract numeric port
-                port_num = re.findall(r"\d+", container_port)
-                if port_num:
-                    exposed_ports.append(int(port_num[0]))
+                # Extract numeric port, dropping a protocol ("80/tcp") and
+                # taking the first port of a range ("80-81")
+                port_num = container_port.partition("/")[0].partition("-")[0]
+                try:
+                    exposed_ports.append(int(port_num))
+                except ValueError:
+                    continue
 
             # Remove the ports section since Traefik will handle routing
             del service_config["ports"]
@@ -292,28 +330,31 @@ class DockerComposeModifier:
         # Check environment variables for common port variables
         if "environment" in service_config:
             env_vars = service_config["environment"]
-            port_env_vars = ["PORT", "HTTP_PORT", "SERVER_PORT", "APP_PORT", "WEB_PORT"]
 
             if isinstance(env_vars, list):
                 for env_var in env_vars:
-                    if isinstance(env_var, str):
-                        for port_var in port_env_vars:
-                            if env_var.startswith(f"{port_var}="):
-                                try:
-                                    port = int(env_var.split("=")[1])
-                                    self.logger.debug(
-                                        f"Detected port {port} from environment variable {env_var}"
-                                    )
-                                    return port
-                                except (ValueError, IndexError):
-                                    continue
+                    if isinstance(env_var, str) and env_var.startswith(
+                        _PORT_ENV_PREFIXES
+                    ):
+                        try:
+                            port = int(env_var.partition("=")[2])
+                            self.logger.debug(
+                                "Detected port %d from environment variable %s",
+                                port,
+                                env_var,
+                            )
+                            return port
+                        except ValueError:
+                            continue
             elif isinstance(env_vars, dict):
-                for port_var in port_env_vars:
+                for port_var in _PORT_ENV_VARS:
                     if port_var in env_vars:
                         try:
                             port = int(env_vars[port_var])
                             self.logger.debug(
-                                f"Detected port {port} from environment variable {port_var}"
+                                "Detected port %d from environment variable %s",
+                                port,
+                                port_var,
                             )
                             return port
                         except (ValueError, TypeError):
@@ -325,7 +366,7 @@ class DockerComposeModifier:
             if exposed and len(exposed) > 0:
                 try:
                     port = int(exposed[0])
-                    self.logger.debug(f"Detected port {port} from expose directive")
+                    self.logger.debug("Detected port %d from expose directive", port)
                     return port
                 except (ValueError, TypeError):
                     pass
@@ -333,21 +374,10 @@ class DockerComposeModifier:
         # Check image name for common frameworks
         if "image" in service_config:
             image = service_config["image"].lower()
-            if "nginx" in image:
-                self.logger.debug("Detected nginx image, using port 80")
-                return 80
-            elif "apache" in image:
-                self.logger.debug("Detected apache image, using port 80")
-                return 80
-            elif "node" in image or "express" in image:
-                self.logger.debug("Detected node/express image, using port 3000")
-                return 3000
-            elif "python" in image or "flask" in image or "django" in image:
-                self.logger.debug("Detected python/flask/django image, using port 8000")
-                return 8000
-            elif "tomcat" in image:
-                self.logger.debug("Detected tomcat image, using port 8080")
-                return 8080
+            for needle, port in _IMAGE_PORT_HINTS:
+                if needle in image:
+                    self.logger.debug("Detected %s image, using port %d", needle, port)
+                    return port
 
         self.logger.debug("Could not detect port from service configuration")
         return None
@@ -1,7 +1,88 @@
-import hashlib
 import hmac
 import logging
 import os
+import queue
+import threading
+from functools import lru_cache
+
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+# Bytes read per step when scanning a file backwards for its last lines
+TAIL_BLOCK_SIZE = 64 * 1024
+
+# Events held for a subscriber that is not keeping up; newer ones are dropped
+EVENT_QUEUE_SIZE = 100
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes and decodes with orjson."""
+
+    def _options(self):
+        # Datetimes go through Flask's default hook to keep its HTTP date format
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """Build a JSON response from orjson's bytes without a str round trip."""
+        if args and kwargs:
+            raise TypeError(
+                "jsonify() behavior undefined when passed both args and kwargs"
+            )
+        if len(args) == 1:
+            obj = args[0]
+        else:
+            obj = args or kwargs or None
+
+        body = orjson.dumps(
+            obj,
+            default=self.default,
+            option=self._options() | orjson.OPT_APPEND_NEWLINE,
+        )
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+class EventBroadcaster:
+    """Fan events out to any number of subscriber queues."""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """Return a new queue that receives every event published from now on."""
+        subscription = queue.Queue(EVENT_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event):
+        """Hand an event to every subscriber without ever blocking the publisher."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(event)
+            except queue.Full:
+                logging.debug("Dropped event for a slow subscriber")
+
+
+@lru_cache(maxsize=4)
+def _secret_key(secret):
+    """Encode the webhook secret once rather than on every delivery."""
+    return secret.encode("utf-8")
 
 
 def verify_github_webhook(payload_body, signature_header, secret):
@@ -29,13 +110,16 @@ def verify_github_webhook(payload_body, signature_header, secret):
         logging.warning("Invalid signature header format")
         return False
 
-    # Extract the hash part
-    github_signature = signature_header[7:]
+    # Extract the hash part as raw bytes, so the digests are compared unencoded
+    try:
+        github_signature = bytes.fromhex(signature_header[7:])
+    except ValueError:
+        logging.warning("Invalid signature header format")
+        return False
 
-    # Create our own signature
-    expected_signature = hmac.new(
-        secret.encode("utf-8"), payload_body, hashlib.sha256
-    ).hexdigest()
+    # Create our own signature with the one-shot OpenSSL HMAC, skipping the
+    # Python-level HMAC object setup
+    expected_signature = hmac.digest(_secret_key(secret), payload_body, "sha256")
 
     # Use constant-time comparison to prevent timing attacks
     is_valid = hmac.compare_digest(github_signature, expected_signature)
@@ -44,3 +128,35 @@ def verify_github_webhook(payload_body, signature_header, secret):
         logging.warning("Invalid webhook signature")
 
     return is_valid
+
+
+def tail_lines(path, n, block_size=TAIL_BLOCK_SIZE):
+    """
+    Return the last n lines of a file, reading backwards from the end.
+
+    Args:
+        path: Path of the file to read
+        n (int): Number of lines to return
+        block_size (int): Bytes read per backwards step
+
+    Returns:
+        list: Up to n lines, each with its line ending kept
+    """
+    if n <= 0:
+        return []
+
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        data = b""
+
+        # One extra line break guarantees the first returned line is complete
+        while pos > 0 and data.count(b"\n") <= n:
+            read_size = min(block_size, pos)
+            pos -= read_size
+            f.seek(pos)
+            data = f.read(read_size) + data
+
+    return [
+        line.decode("utf-8", errors="replace")
+        for line in data.splitlines(keepends=True)[-n:]
+    ]
@@ -9,8 +9,23 @@ class BaseConfig:
     SERVICE_HOST = os.environ.get("HOST")
     SERVICE_PORT = os.environ.get("PORT")
     GITHUB_WEBHOOK_SECRET = os.environ.get("GITHUB_WEBHOOK_SECRET")
+    # Deployments are I/O bound (git, docker build), so more can run than there are CPUs
+    DEPLOY_WORKERS = int(os.environ.get("DEPLOY_WORKERS", 4))
+    # Each open /deploys/stream holds a gunicorn thread, so keep this below
+    # GUNICORN_THREADS; further streams are refused with 503
+    DEPLOY_EVENTS_MAX_STREAMS = int(os.environ.get("DEPLOY_EVENTS_MAX_STREAMS", 8))
+    # Templates are compiled once; set to 1 while editing them to pick up changes
+    TEMPLATES_AUTO_RELOAD = os.environ.get("TEMPLATES_AUTO_RELOAD") == "1"
+    # Larger request bodies are refused with 413 before they are read
+    MAX_CONTENT_LENGTH = int(os.environ.get("MAX_CONTENT_LENGTH", 1024 * 1024))
+    TRAEFIK_DASHBOARD_URL = os.environ.get(
+        "TRAEFIK_DASHBOARD_URL", "http://localhost:8080"
+    )
+    # Flask-Compress feeds a streamed body through one compressor without flushing,
+    # which would hold it back until the end, so streamed responses go uncompressed
+    COMPRESS_STREAMS = False
     # Generate a secure secret key if not provided in environment
-    SECRET_KEY = os.environ.get("SECRET_KEY", secrets.token_hex(32))
+    SECRET_KEY = os.environ.get("SECRET_KEY") or secrets.token_hex(32)
 
 
 class ProductionConfig(BaseConfig):
@@ -0,0 +1,17 @@
+import os
+
+# Serve the app with: gunicorn -c gunicorn.conf.py run:app
+bind = f"{os.environ.get('HOST', '127.0.0.1')}:{os.environ.get('PORT', 5000)}"
+
+# Requests are I/O bound (SQLite, docker, subprocesses), so threads give the
+# concurrency. A single worker keeps the deploy pool, the per-repo webhook
+# coalescing and the deployment event stream in one process.
+worker_class = "gthread"
+workers = 1
+threads = int(os.environ.get("GUNICORN_THREADS", 16))
+
+# Deploys run on background threads, so requests themselves return quickly;
+# /deploys/stream connections stay open and each hold one thread, so at most
+# DEPLOY_EVENTS_MAX_STREAMS (default 8) are allowed; keep it below threads
+timeout = 120
+graceful_timeout = 30